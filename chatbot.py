@@ -1,344 +1,239 @@
 
 import os
 import json
-from typing import List, Dict, Optional, Any
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Iterator, AsyncIterator, TYPE_CHECKING
 from datetime import datetime, date
 from dotenv import load_dotenv
+from cachetools import TTLCache
+import httpx
+from pydantic import BaseModel, Field
+from prompt_toolkit import PromptSession
 
-from langchain.agents import Tool, AgentExecutor, create_openai_functions_agent
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.tools import tool
+# Only the tool decorator is needed at import time; agent, memory and OpenAI
+# modules are imported when a HotelChatbot is first built
+from langchain_core.tools import tool
 
-from database import DatabaseConnection
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+from config import CHATBOT_CONFIG, SUPPORTED_CITIES
 from hotel_search_service import HotelSearchService
 
 # Load environment variables
 load_dotenv(override=True)
 
+# Keep-alive HTTP/2 clients shared by every OpenAI call so requests reuse open connections
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40)
+_SHARED_HTTP_CLIENT = httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=30)
+_SHARED_ASYNC_HTTP_CLIENT = httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, timeout=30)
+_OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+
+# Short-lived cache of read-only search results, keyed by (tool name, normalized args)
+_SEARCH_CACHE = TTLCache(maxsize=512, ttl=60)
+_SEARCH_CACHE_LOCK = threading.Lock()
+
+
+def _cache_key(tool_name: str, *args) -> tuple:
+    """Build a cache key from lowercased, stripped arguments"""
+    return (tool_name, tuple(str(arg).strip().lower() if arg is not None else None for arg in args))
+
+
+def _cached(key: tuple, fn):
+    """Return the cached result for key, or call fn() and cache it"""
+    with _SEARCH_CACHE_LOCK:
+        if key in _SEARCH_CACHE:
+            return _SEARCH_CACHE[key]
+    result = fn()
+    # Failed queries come back as None and are not cached
+    if result is not None:
+        with _SEARCH_CACHE_LOCK:
+            _SEARCH_CACHE[key] = result
+    return result
+
+
+def _invalidate_search_cache() -> None:
+    """Drop every cached search result after the summary views are refreshed"""
+    with _SEARCH_CACHE_LOCK:
+        _SEARCH_CACHE.clear()
+
+
+# Background warm-up of likely follow-up lookups; the semaphore caps in-flight queries
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hotelbot-prefetch")
+_PREFETCH_SLOTS = threading.BoundedSemaphore(4)
+_PREFETCH_TOP_N = 5
+
+
+def _prefetch_hotel_details(hotel_id: int) -> None:
+    """Warm the cache entry of search_hotels(hotel_id=..., include_rooms=True)"""
+    try:
+        _cached(
+            _cache_key('search_hotels', None, None, None, None, hotel_id, None, True),
+            lambda: _TOOLS_SINGLETON.search_service.search_hotels(hotel_id=hotel_id, include_rooms=True)
+        )
+    except Exception as e:
+        print(f"Error prefetching hotel {hotel_id}: {e}")
+    finally:
+        _PREFETCH_SLOTS.release()
+
+
+def _prefetch_city(city: str) -> None:
+    """Warm the cache entry of search_hotels(city=...)"""
+    try:
+        _cached(
+            _cache_key('search_hotels', city, None, None, None, None, None, False),
+            lambda: _TOOLS_SINGLETON.search_service.search_hotels(city=city)
+        )
+    except Exception as e:
+        # One failed city must not fail the whole warm-up
+        print(f"Error prefetching {city} hotels: {e}")
+
+
+async def _warm_openai_connection() -> None:
+    """Open the pooled connection to the OpenAI API before the first question"""
+    try:
+        await _SHARED_ASYNC_HTTP_CLIENT.get(
+            f"{_OPENAI_BASE_URL}/models",
+            headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+        )
+    except httpx.HTTPError:
+        # Only a warm-up; the real request will surface any connection problem
+        pass
+
+
+async def _prefetch_common_cities() -> None:
+    """Warm city searches for the supported cities on the prefetch executor"""
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(_PREFETCH_EXECUTOR, _prefetch_city, city)
+        for city in SUPPORTED_CITIES
+    ))
+
+
+def _schedule_prefetch(hotels: List[Dict]) -> None:
+    """Queue detail prefetches for the top hotels, skipping any that find no free slot"""
+    for hotel in hotels[:_PREFETCH_TOP_N]:
+        if not _PREFETCH_SLOTS.acquire(blocking=False):
+            break
+        _PREFETCH_EXECUTOR.submit(_prefetch_hotel_details, hotel['id'])
+
+
+# Per-row output templates, pre-bound to str.format_map once at import
+_DETAIL_ROOM_TEMPLATE = "  • Room {room_number} ({room_type}) - ${price_per_night}/night\n".format_map
+_SEARCH_HOTEL_TEMPLATE = (
+    "🏨 **{name}** (Hotel ID: {id})\n"
+    "   📍 {address}, {city}\n"
+    "   ⭐ Stars: {stars}/5\n"
+    "   🏠 Total Rooms: {total_rooms}\n"
+    "   ✅ Available Rooms: {available_rooms}\n"
+).format_map
+_SEARCH_PRICE_TEMPLATE = "   💰 Room Price Range: ${min_room_price:.2f} - ${max_room_price:.2f}\n".format_map
+
+# Replies longer than this are cut short; the model does not need every row
+_MAX_REPLY_CHARS = 6000
+
+
+def _extend_limited(parts: List[str], blocks, total: int) -> None:
+    """Append formatted blocks to parts, stopping once the reply would exceed _MAX_REPLY_CHARS"""
+    size = sum(len(part) for part in parts)
+    shown = 0
+    for block in blocks:
+        size += len(block)
+        if size > _MAX_REPLY_CHARS:
+            break
+        parts.append(block)
+        shown += 1
+    if shown < total:
+        parts.append(f"... and {total - shown} more results. Add filters to narrow the search.\n")
+
+
+class SearchHotelsInput(BaseModel):
+    """Arguments of the search_hotels tool; every filter is optional"""
+    city: Optional[str] = Field(None, description="City to search in")
+    min_rating: Optional[float] = Field(None, description="Minimum star rating between 1 and 5")
+    min_price: Optional[float] = Field(None, description="Minimum room price per night")
+    max_price: Optional[float] = Field(None, description="Maximum room price per night")
+    hotel_id: Optional[int] = Field(None, description="ID of a specific hotel")
+    hotel_name: Optional[str] = Field(None, description="Full or partial hotel name")
+    include_rooms: bool = Field(False, description="Also list the available rooms of each hotel")
+
+
 class HotelBotTools:
     """Tools for the hotel chatbot to interact with the database"""
     
     def __init__(self):
         self.search_service = HotelSearchService()
-        self.db = DatabaseConnection()
+        # Pooled connections are closed by the database module at process exit
         self.search_service.connect()
-    
-    def __del__(self):
-        """Cleanup database connections"""
-        try:
-            self.search_service.disconnect()
-        except:
-            pass
+        self.search_service.add_refresh_listener(_invalidate_search_cache)
 
-    @tool
-    def search_hotels_by_city(city: str) -> str:
-        """Search for hotels in a specific city. Use this when user asks about hotels in a particular location."""
-        try:
-            tools_instance = HotelBotTools()
-            hotels = tools_instance.search_service.search_hotels_by_city(city)
-            
-            if not hotels:
-                return f"No hotels found in {city}. Please try another city."
-            
-            result = f"Found {len(hotels)} hotels in {city}:\n\n"
-            for hotel in hotels:
-                result += f"🏨 **{hotel['name']}** (Hotel ID: {hotel['id']})\n"
-                result += f"   📍 {hotel['address']}, {hotel['city']}, {hotel['country']}\n"
-                result += f"   ⭐ Rating: {hotel['rating']}/5.0\n"
-                result += f"   🏠 Total Rooms: {hotel['total_rooms']}\n"
-                result += f"   ✅ Available Rooms: {hotel['available_rooms']}\n\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error searching hotels: {str(e)}"
-    
-    @tool
-    def search_hotels_by_rating(min_rating: str) -> str:
-        """Search for hotels with minimum rating. Rating should be between 1.0 and 5.0."""
+    @tool(args_schema=SearchHotelsInput)
+    def search_hotels(city: Optional[str] = None, min_rating: Optional[float] = None,
+                      min_price: Optional[float] = None, max_price: Optional[float] = None,
+                      hotel_id: Optional[int] = None, hotel_name: Optional[str] = None,
+                      include_rooms: bool = False) -> str:
+        """Search hotels by any combination of city, star rating, room price range, hotel ID or name. Set include_rooms to list available rooms, e.g. for follow-up questions about a specific hotel."""
         try:
-            rating = float(min_rating)
-            if rating < 1.0 or rating > 5.0:
+            if min_rating is not None and (min_rating < 1.0 or min_rating > 5.0):
                 return "Rating must be between 1.0 and 5.0"
             
-            tools_instance = HotelBotTools()
-            hotels = tools_instance.search_service.search_hotels_by_rating(rating)
-            
-            if not hotels:
-                return f"No hotels found with rating {rating} or higher."
-            
-            result = f"Found {len(hotels)} hotels with rating {rating}+ stars:\n\n"
-            for hotel in hotels:
-                result += f"🏨 **{hotel['name']}** (Hotel ID: {hotel['id']})\n"
-                result += f"   📍 {hotel['city']}, {hotel['country']}\n"
-                result += f"   ⭐ Rating: {hotel['rating']}/5.0\n"
-                result += f"   🏠 Available Rooms: {hotel['available_rooms']}\n\n"
-            
-            return result
-            
-        except ValueError:
-            return "Invalid rating format. Please provide a number between 1.0 and 5.0"
-        except Exception as e:
-            return f"Error searching hotels by rating: {str(e)}"
-    
-    @tool
-    def get_available_rooms(filters: str = "") -> str:
-        """Get available rooms with optional filters. Pass filters as a string like 'hotel_id:1,room_type:single,max_price:200'"""
-        try:
-            tools_instance = HotelBotTools()
-            
-            # Parse filters
-            hotel_id_int = None
-            room_type = None
-            max_price_float = None
-            
-            if filters:
-                for filter_item in filters.split(','):
-                    if ':' in filter_item:
-                        key, value = filter_item.split(':', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        
-                        if key == 'hotel_id' and value.isdigit():
-                            hotel_id_int = int(value)
-                        elif key == 'room_type':
-                            room_type = value
-                        elif key == 'max_price':
-                            try:
-                                max_price_float = float(value)
-                            except ValueError:
-                                pass
-            
-            rooms = tools_instance.search_service.get_available_rooms(
-                hotel_id=hotel_id_int,
-                room_type=room_type,
-                max_price=max_price_float
-            )
-            
-            if not rooms:
-                return "No available rooms found with the specified criteria."
-            
-            result = f"Found {len(rooms)} available rooms:\n\n"
-            for room in rooms:
-                result += f"🏠 **Room {room['room_number']}** - {room['room_type']}\n"
-                result += f"   🏨 Hotel: {room['hotel_name']}\n"
-                result += f"   📍 Location: {room['city']}\n"
-                result += f"   💰 Price: ${room['price_per_night']}/night\n"
-                result += f"   🆔 Room ID: {room['id']}\n\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error fetching available rooms: {str(e)}"
-    
-    @tool
-    def get_room_types_and_prices(hotel_id: str = "") -> str:
-        """Get room types and their price ranges. Optionally filter by hotel_id."""
-        try:
-            tools_instance = HotelBotTools()
-            
-            hotel_id_int = int(hotel_id) if hotel_id and hotel_id.isdigit() else None
-            
-            room_types = tools_instance.search_service.get_room_types_and_prices(hotel_id_int)
-            
-            if not room_types:
-                return "No room types found."
-            
-            result = "Available room types and prices:\n\n"
-            for room_type in room_types:
-                result += f"🏠 **{room_type['room_type']}**\n"
-                if hotel_id_int:
-                    result += f"   🏨 Hotel: {room_type['hotel_name']}\n"
-                else:
-                    result += f"   🏨 Hotel: {room_type['hotel_name']} ({room_type['city']})\n"
-                result += f"   📊 Available: {room_type['available_count']} rooms\n"
-                result += f"   💰 Price Range: ${room_type['min_price']:.2f} - ${room_type['max_price']:.2f}\n"
-                result += f"   📈 Average Price: ${room_type['avg_price']:.2f}/night\n\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error fetching room types: {str(e)}"
-    
-    @tool
-    def search_hotels_by_price_range(min_price: str, max_price: str) -> str:
-        """Search hotels with rooms in a specific price range per night."""
-        try:
-            min_price_float = float(min_price)
-            max_price_float = float(max_price)
-            
-            if min_price_float > max_price_float:
+            if min_price is not None and max_price is not None and min_price > max_price:
                 return "Minimum price cannot be greater than maximum price."
             
-            tools_instance = HotelBotTools()
-            hotels = tools_instance.search_service.search_hotels_by_price_range(min_price_float, max_price_float)
+            hotels = _cached(
+                _cache_key('search_hotels', city, min_rating, min_price, max_price, hotel_id, hotel_name, include_rooms),
+                lambda: _TOOLS_SINGLETON.search_service.search_hotels(
+                    city=city,
+                    min_rating=min_rating,
+                    min_price=min_price,
+                    max_price=max_price,
+                    hotel_id=hotel_id,
+                    hotel_name=hotel_name,
+                    include_rooms=include_rooms
+                )
+            )
             
             if not hotels:
-                return f"No hotels found with rooms in the price range ${min_price} - ${max_price}."
-            
-            result = f"Found {len(hotels)} hotels with rooms in ${min_price} - ${max_price} range:\n\n"
-            for hotel in hotels:
-                result += f"🏨 **{hotel['name']}**\n"
-                result += f"   📍 {hotel['city']}, {hotel['country']}\n"
-                result += f"   ⭐ Rating: {hotel['rating']}/5.0\n"
-                result += f"   💰 Room Price Range: ${hotel['min_room_price']:.2f} - ${hotel['max_room_price']:.2f}\n"
-                result += f"   🏠 Available Rooms: {hotel['total_rooms']}\n\n"
+                return "No hotels found matching your criteria. Please try different filters."
+            
+            # Users usually follow a list search with "tell me more about X"
+            if not include_rooms and len(hotels) > 1:
+                _schedule_prefetch(hotels)
+            
+            def format_hotel(hotel):
+                block = [_SEARCH_HOTEL_TEMPLATE(hotel)]
+                if hotel['min_room_price'] is not None:
+                    block.append(_SEARCH_PRICE_TEMPLATE(hotel))
+                if include_rooms:
+                    if hotel['rooms']:
+                        block.append("   **Available Rooms:**\n")
+                        block.extend(_DETAIL_ROOM_TEMPLATE(room) for room in hotel['rooms'])
+                    else:
+                        block.append("   No rooms currently available.\n")
+                block.append("\n")
+                return "".join(block)
+            
+            # The query stops at LIMIT rows; total_count is the match count before the cap
+            total = hotels[0]['total_count']
+            parts = [f"Found {total} hotels:\n\n"]
+            _extend_limited(parts, (format_hotel(hotel) for hotel in hotels), total)
+            
+            return "".join(parts)
             
-            return result
-            
-        except ValueError:
-            return "Invalid price format. Please provide valid numbers."
         except Exception as e:
-            return f"Error searching hotels by price range: {str(e)}"
-    
-    @tool
-    def get_hotel_details(hotel_id: str) -> str:
-        """Get detailed information about a specific hotel including all its rooms."""
-        try:
-            hotel_id_int = int(hotel_id)
-            
-            tools_instance = HotelBotTools()
-            
-            # Get hotel info
-            hotel_query = """
-            SELECT h.*, 
-                   COUNT(r.id) as total_rooms,
-                   COUNT(CASE WHEN r.is_available = true THEN 1 END) as available_rooms
-            FROM hotels h
-            LEFT JOIN rooms r ON h.id = r.hotel_id
-            WHERE h.id = %s
-            GROUP BY h.id, h.name, h.address, h.city, h.country, h.rating, h.created_at;
-            """
-            
-            hotels = tools_instance.db.execute_query(hotel_query, (hotel_id_int,))
-            
-            if not hotels:
-                return f"Hotel with ID {hotel_id} not found."
-            
-            hotel = hotels[0]
-            
-            # Get room details
-            rooms = tools_instance.search_service.get_available_rooms(hotel_id=hotel_id_int)
-            
-            result = f"🏨 **{hotel['name']}** (ID: {hotel['id']})\n"
-            result += f"📍 Address: {hotel['address']}, {hotel['city']}, {hotel['country']}\n"
-            result += f"⭐ Rating: {hotel['rating']}/5.0\n"
-            result += f"🏠 Total Rooms: {hotel['total_rooms']}\n"
-            result += f"✅ Available Rooms: {hotel['available_rooms']}\n\n"
-            
-            if rooms:
-                result += "**Available Rooms:**\n"
-                for room in rooms:
-                    result += f"  • Room {room['room_number']} ({room['room_type']}) - ${room['price_per_night']}/night\n"
-            else:
-                result += "No rooms currently available.\n"
-            
-            return result
-            
-        except ValueError:
-            return "Invalid hotel ID format. Please provide a valid number."
-        except Exception as e:
-            return f"Error fetching hotel details: {str(e)}"
+            return f"Error searching hotels: {str(e)}"
 
-    @tool
-    def search_hotel_by_name(hotel_name: str) -> str:
-        """Search for a hotel by its name and get its details and available rooms."""
-        try:
-            tools_instance = HotelBotTools()
-            
-            # Search for hotel by name
-            search_query = """
-            SELECT h.*, 
-                   COUNT(r.id) as total_rooms,
-                   COUNT(CASE WHEN r.is_available = true THEN 1 END) as available_rooms
-            FROM hotels h
-            LEFT JOIN rooms r ON h.id = r.hotel_id
-            WHERE LOWER(h.name) LIKE LOWER(%s)
-            GROUP BY h.id, h.name, h.address, h.city, h.country, h.rating, h.created_at;
-            """
-            
-            tools_instance.db.connect()
-            hotels = tools_instance.db.execute_query(search_query, (f"%{hotel_name}%",))
-            
-            if not hotels:
-                return f"No hotel found with name '{hotel_name}'. Please try a different name or search by city."
-            
-            hotel = hotels[0]
-            
-            # Get available rooms for this hotel
-            rooms = tools_instance.search_service.get_available_rooms(hotel_id=hotel['id'])
-            
-            result = f"🏨 **{hotel['name']}** (Hotel ID: {hotel['id']})\n"
-            result += f"📍 Address: {hotel['address']}, {hotel['city']}, {hotel['country']}\n"
-            result += f"⭐ Rating: {hotel['rating']}/5.0\n"
-            result += f"🏠 Total Rooms: {hotel['total_rooms']}\n"
-            result += f"✅ Available Rooms: {hotel['available_rooms']}\n\n"
-            
-            if rooms:
-                result += "**Available Room Types:**\n"
-                room_types = {}
-                for room in rooms:
-                    room_type = room['room_type']
-                    if room_type not in room_types:
-                        room_types[room_type] = []
-                    room_types[room_type].append(room)
-                
-                for room_type, type_rooms in room_types.items():
-                    result += f"\n🏠 **{room_type}** ({len(type_rooms)} available)\n"
-                    for room in type_rooms[:3]:  # Show first 3 rooms of each type
-                        result += f"  • Room {room['room_number']} - ${room['price_per_night']}/night\n"
-                    if len(type_rooms) > 3:
-                        result += f"  • ... and {len(type_rooms) - 3} more {room_type} rooms\n"
-            else:
-                result += "No rooms currently available at this hotel.\n"
-            
-            tools_instance.db.disconnect()
-            return result
-            
-        except Exception as e:
-            return f"Error searching hotel by name: {str(e)}"
 
+# Shared by every tool call so each one reuses the pooled database connections
+_TOOLS_SINGLETON = HotelBotTools()
 
-class HotelChatbot:
-    """Main chatbot class with memory and LangChain integration"""
-    
-    def __init__(self, openai_api_key: str = None):
-        self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
-        
-        if not self.openai_api_key:
-            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
-        
-        # Initialize LLM
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model="gpt-3.5-turbo",
-            openai_api_key=self.openai_api_key
-        )
-        
-        # Initialize memory
-        self.memory = ConversationBufferWindowMemory(
-            k=10,  # Remember last 10 exchanges
-            memory_key="chat_history",
-            return_messages=True
-        )
-        
-        # Initialize tools
-        self.tools = [
-            HotelBotTools.search_hotels_by_city,
-            HotelBotTools.search_hotels_by_rating,
-            HotelBotTools.get_available_rooms,
-            HotelBotTools.get_room_types_and_prices,
-            HotelBotTools.search_hotels_by_price_range,
-            HotelBotTools.get_hotel_details,
-            HotelBotTools.search_hotel_by_name
-        ]
-        
-        # Create prompt template
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful and friendly hotel booking assistant. Your name is HotelBot. 
+
+# Static system prompt. It must stay byte-identical across turns (no dates or ids)
+# so OpenAI's automatic prompt caching can reuse the prefix.
+_SYSTEM_PROMPT = """You are a helpful and friendly hotel booking assistant. Your name is HotelBot. 
 
 You have access to a comprehensive hotel database and can help users:
 - Search for hotels in specific cities
@@ -360,20 +255,106 @@ Guidelines:
 - If a user asks about booking, explain that you can help them find hotels and rooms, but they would need to contact the hotel directly for actual booking
 - When showing hotel or room information, include relevant details like prices, ratings, and availability
 
-Remember: When users ask follow-up questions about a specific hotel, use the search_hotel_by_name tool or get_hotel_details with the hotel ID to get current information.
+Remember: When users ask follow-up questions about a specific hotel, use the search_hotels tool with the hotel name or hotel_id and include_rooms set to get current information.
 
-Always be helpful and provide the most relevant information based on the user's needs."""),
-            
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad")
-        ])
+Always be helpful and provide the most relevant information based on the user's needs."""
+
+# Tag on the memory summarizer's runs
+_SUMMARY_TAG = "memory_summary"
+
+# Every chatbot drives its agent on this one background loop, so creating a bot does not
+# start a loop thread of its own. The async HTTP client pools connections per loop, so the
+# shared LLMs (and the warm-up) must never be awaited from a second one
+_AGENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_AGENT_LOOP_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _build_agent(openai_api_key: str):
+    """Build the LLM, tools, prompt and agent once per process; they hold no per-session state"""
+    from langchain.agents import create_openai_tools_agent
+    from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain_core.messages import SystemMessage
+    from langchain_openai import ChatOpenAI
+    
+    # Initialize LLM
+    llm = ChatOpenAI(
+        temperature=0.7,
+        model=CHATBOT_CONFIG["model"],
+        max_tokens=CHATBOT_CONFIG["max_tokens"],
+        openai_api_key=openai_api_key,
+        streaming=True,
+        http_client=_SHARED_HTTP_CLIENT,
+        http_async_client=_SHARED_ASYNC_HTTP_CLIENT
+    )
+    
+    # Deterministic model for condensing older turns; tagged so its tokens stay out of the reply stream
+    summary_llm = ChatOpenAI(
+        temperature=0,
+        model=CHATBOT_CONFIG["summary_model"],
+        openai_api_key=openai_api_key,
+        tags=[_SUMMARY_TAG],
+        http_client=_SHARED_HTTP_CLIENT,
+        http_async_client=_SHARED_ASYNC_HTTP_CLIENT
+    )
+    
+    # A single parametric search tool keeps the function schema sent each turn small
+    tools = [
+        HotelBotTools.search_hotels
+    ]
+    
+    # Create prompt template; the system message leads, verbatim, so the provider can cache the prefix
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=_SYSTEM_PROMPT),
         
-        # Create agent
-        self.agent = create_openai_functions_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=self.prompt
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad")
+    ])
+    
+    # Tools agent so the model can request several tool calls in one step;
+    # the async executor runs them concurrently
+    agent = create_openai_tools_agent(
+        llm=llm,
+        tools=tools,
+        prompt=prompt
+    )
+    
+    return llm, summary_llm, agent, prompt, tools
+
+
+def _agent_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting it on first use"""
+    global _AGENT_LOOP
+    with _AGENT_LOOP_LOCK:
+        if _AGENT_LOOP is None:
+            _AGENT_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_AGENT_LOOP.run_forever, name="hotelbot-events", daemon=True).start()
+        return _AGENT_LOOP
+
+
+class HotelChatbot:
+    """Main chatbot class with memory and LangChain integration"""
+    
+    def __init__(self, openai_api_key: str = None):
+        self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
+        
+        if not self.openai_api_key:
+            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
+        
+        from langchain.agents import AgentExecutor
+        from langchain.memory import ConversationSummaryBufferMemory
+        
+        # Shared agent; only the memory and executor are per session
+        self.llm, self.summary_llm, self.agent, self.prompt, self.tools = _build_agent(self.openai_api_key)
+        
+        # Initialize memory
+        # Recent turns stay verbatim; older ones are folded into a running summary
+        self.memory = ConversationSummaryBufferMemory(
+            llm=self.summary_llm,
+            max_token_limit=800,
+            memory_key="chat_history",
+            return_messages=True
         )
         
         # Create agent executor
@@ -381,14 +362,70 @@ Always be helpful and provide the most relevant information based on the user's
             agent=self.agent,
             tools=self.tools,
             memory=self.memory,
-            verbose=True,
+            # The chain trace would be printed into the middle of streamed replies
+            verbose=False,
             handle_parsing_errors=True
         )
+        
+        # Shared background loop that drives the async event stream for sync callers
+        self._loop = _agent_loop()
+    
+    def _run(self, coro):
+        """Run a coroutine on the background loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _on_loop(self, coro):
+        """Await a coroutine on the background loop from any event loop"""
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+    
+    async def _astream_tokens(self, message: str) -> AsyncIterator[str]:
+        """Yield text tokens of the agent's reply as the LLM produces them"""
+        async for event in self.agent_executor.astream_events({"input": message}, version="v2"):
+            if event["event"] == "on_chat_model_stream" and _SUMMARY_TAG not in event.get("tags", []):
+                # Tool-calling steps stream empty content, so only the answer text comes through
+                content = event["data"]["chunk"].content
+                if content:
+                    yield content
+    
+    def stream_chat(self, message: str) -> Iterator[str]:
+        """Stream the response text chunk by chunk"""
+        tokens = self._astream_tokens(message)
+        try:
+            while True:
+                try:
+                    yield self._run(tokens.__anext__())
+                except StopAsyncIteration:
+                    break
+        except Exception as e:
+            yield f"I apologize, but I encountered an error: {str(e)}. Please try again or rephrase your question."
+        finally:
+            self._run(tokens.aclose())
     
     def chat(self, message: str) -> str:
         """Main chat method"""
+        return "".join(self.stream_chat(message))
+    
+    async def astream_chat(self, message: str) -> AsyncIterator[str]:
+        """Async variant of stream_chat for callers that already run an event loop"""
+        tokens = self._astream_tokens(message)
         try:
-            response = self.agent_executor.invoke({"input": message})
+            while True:
+                try:
+                    token = await self._on_loop(tokens.__anext__())
+                except StopAsyncIteration:
+                    break
+                yield token
+        except Exception as e:
+            yield f"I apologize, but I encountered an error: {str(e)}. Please try again or rephrase your question."
+        finally:
+            await self._on_loop(tokens.aclose())
+    
+    async def achat(self, message: str) -> str:
+        """Async chat method for callers that already run an event loop"""
+        try:
+            response = await self._on_loop(self.agent_executor.ainvoke({"input": message}))
             return response["output"]
         except Exception as e:
             return f"I apologize, but I encountered an error: {str(e)}. Please try again or rephrase your question."
@@ -397,23 +434,32 @@ Always be helpful and provide the most relevant information based on the user's
         """Reset the conversation memory"""
         self.memory.clear()
     
-    def get_conversation_history(self) -> List[BaseMessage]:
+    def get_conversation_history(self) -> List["BaseMessage"]:
         """Get the current conversation history"""
         return self.memory.chat_memory.messages
 
 
-def main():
-    """Main function to run the chatbot"""
+async def amain():
+    """Async REPL; the prompt waits without blocking background warm-up work"""
     print("🏨 Welcome to HotelBot! 🏨")
     print("I can help you find hotels, check room availability, and get pricing information.")
     print("Type 'quit' to exit or 'reset' to clear conversation history.\n")
     
+    warmup_tasks = []
     try:
         # Initialize chatbot
         chatbot = HotelChatbot()
+        session = PromptSession()
+        
+        # Warm the OpenAI connection and common searches while the user is typing;
+        # the HTTP client's connections live on the shared agent loop, so the warm-up runs there too
+        warmup_tasks = [
+            asyncio.create_task(chatbot._on_loop(_warm_openai_connection())),
+            asyncio.create_task(_prefetch_common_cities())
+        ]
         
         while True:
-            user_input = input("You: ").strip()
+            user_input = (await session.prompt_async("You: ")).strip()
             
             if user_input.lower() in ['quit', 'exit', 'bye']:
                 print("HotelBot: Thank you for using HotelBot! Have a great day! 🌟")
@@ -427,15 +473,30 @@ def main():
             if not user_input:
                 continue
             
-            # Get response from chatbot
-            response = chatbot.chat(user_input)
-            print(f"HotelBot: {response}\n")
+            # Print the response as it streams in
+            print("HotelBot: ", end="", flush=True)
+            async for delta in chatbot.astream_chat(user_input):
+                print(delta, end="", flush=True)
+            print("\n")
             
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
         print("\nHotelBot: Goodbye! 👋")
     except Exception as e:
         print(f"Error initializing chatbot: {str(e)}")
         print("Please make sure your OpenAI API key is set in the .env file.")
+    finally:
+        # Stop the warm-up on every exit path and wait for it so no task is left pending
+        for task in warmup_tasks:
+            task.cancel()
+        await asyncio.gather(*warmup_tasks, return_exceptions=True)
+
+
+def main():
+    """Main function to run the chatbot"""
+    try:
+        asyncio.run(amain())
+    except KeyboardInterrupt:
+        print("\nHotelBot: Goodbye! 👋")
 
 
 if __name__ == "__main__":
@@ -1,22 +1,38 @@
 import os
 import json
 import re
-from typing import List, Dict, Optional, Any, Annotated, TypedDict
+import asyncio
+import atexit
+import threading
+import weakref
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Annotated, TypedDict, Iterator, AsyncIterator
 from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor
+from cachetools import TTLCache
+import httpx
+from openai import RateLimitError
+from prompt_toolkit import PromptSession
 
 from langchain_openai import ChatOpenAI
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
 from langchain.tools import tool
-from langchain_core.messages import ToolMessage
+from langchain_community.cache import SQLiteCache
 from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import RemoveMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
 
-from langgraph.graph import StateGraph, END, START
+from langgraph.graph import StateGraph, START
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
+from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.checkpoint.memory import MemorySaver
-from langgraph.constants import Send
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from config import CHATBOT_CONFIG, DATABASE_CONFIG, TOOL_CONFIG
 
 from database import DatabaseConnection
 from hotel_search_service import HotelSearchService
@@ -24,658 +40,841 @@ from hotel_search_service import HotelSearchService
 # Load environment variables
 load_dotenv(override=True)
 
+# One keep-alive HTTP/2 client for all OpenAI calls so concurrent turns share connections;
+# idle connections outlive the warm-up interval so a ping keeps them open between questions
+_ASYNC_HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=90),
+    timeout=30
+)
+_OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+_WARMUP_INTERVAL = 60
+
+# Every bot runs its graph turns on this one background loop; the HTTP client above pools
+# connections per loop, so the shared LLMs must never be awaited from a second one
+_GRAPH_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_GRAPH_LOOP_LOCK = threading.Lock()
+
+# One checkpoint store (and Postgres pool) for every bot, opened on the graph loop on first
+# use and closed at process exit, so creating bots never opens more database connections
+_CHECKPOINTER = None
+_CHECKPOINT_POOL: Optional[AsyncConnectionPool] = None
+_PRUNE_TASK: Optional[asyncio.Task] = None
+_CHECKPOINTER_LOCK = threading.Lock()
+
+# Caps in-flight OpenAI requests so bursts queue here instead of tripping rate limits.
+# An asyncio semaphore belongs to one loop, so each loop that runs the graph gets its own
+_LLM_MAX_ASYNC = int(os.getenv("LLM_MAX_ASYNC", "16"))
+_LLM_SEMS = weakref.WeakKeyDictionary()
+
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    """Return the OpenAI request limiter of the running loop"""
+    loop = asyncio.get_running_loop()
+    sem = _LLM_SEMS.get(loop)
+    if sem is None:
+        sem = _LLM_SEMS[loop] = asyncio.Semaphore(_LLM_MAX_ASYNC)
+    return sem
+
+
+# Runs independent lookups of one tool call side by side, each on its own pooled connection
+_QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=DATABASE_CONFIG["pool_max_connections"], thread_name_prefix="hotelbot-query")
+
+# Short-lived cache of read-only search results keyed on (query, normalized args).
+# Bookings and cancellations clear it so availability never goes stale.
+_SEARCH_CACHE = TTLCache(maxsize=2048, ttl=60)
+_SEARCH_CACHE_LOCK = threading.Lock()
+
+
+def _cache_key(query_name: str, *args) -> tuple:
+    """Build a cache key from lowercased, stripped arguments"""
+    return (query_name, tuple(str(arg).strip().lower() if arg is not None else None for arg in args))
+
+
+def _cached(key: tuple, fn):
+    """Return the cached result for key, or call fn() and cache it"""
+    with _SEARCH_CACHE_LOCK:
+        if key in _SEARCH_CACHE:
+            return _SEARCH_CACHE[key]
+    result = fn()
+    # Failed queries come back as None and are not cached
+    if result is not None:
+        with _SEARCH_CACHE_LOCK:
+            _SEARCH_CACHE[key] = result
+    return result
+
+
+def _invalidate_search_cache() -> None:
+    """Drop every cached search result after inventory changes"""
+    with _SEARCH_CACHE_LOCK:
+        _SEARCH_CACHE.clear()
+
+
+# List tools return one page of rows per call
+_PAGE_SIZE = TOOL_CONFIG["max_results_per_search"]
+
+# Reply fragments, bound once at import and filled per row
+_CITY_HOTEL_HEAD = "🏨 **{name}** (Hotel ID: {id})\n   📍 {address}, {city}\n   ⭐ Stars: {stars}/5\n".format_map
+_CITY_HOTEL_TAIL = "   🏠 Total Rooms: {total_rooms}\n   ✅ Available Rooms: {available_rooms}\n".format_map
+_RATED_HOTEL_HEAD = "🏨 **{name}** (Hotel ID: {id})\n   📍 {city}\n   ⭐ Stars: {stars}/5\n".format_map
+_RATED_HOTEL_TAIL = "   🏠 Available Rooms: {available_rooms}\n".format_map
+_PRICED_HOTEL_HEAD = "🏨 **{name}**\n   📍 {city}\n   ⭐ Stars: {stars}/5\n".format_map
+_PRICED_HOTEL_TAIL = (
+    "   💰 Room Price Range: ${min_room_price:.2f} - ${max_room_price:.2f}\n"
+    "   🏠 Available Rooms: {total_rooms}\n"
+).format_map
+_DESCRIPTION_LINE = "   📝 {description}\n".format_map
+_AMENITIES_LINE = "   🎯 Amenities: {}\n".format
+_ROOM_TEMPLATE = (
+    "🏠 **Room {room_number}** - {room_type}\n"
+    "   🏨 Hotel: {hotel_name}\n"
+    "   📍 Location: {city}\n"
+    "   💰 Price: ${price_per_night}/night\n"
+    "   👥 Capacity: {capacity} guests\n"
+    "   🆔 Room ID: {id}\n"
+).format_map
+_ROOM_TYPE_HOTEL_TEMPLATE = "🏠 **{room_type}**\n   🏨 Hotel: {hotel_name}\n".format_map
+_ROOM_TYPE_HOTEL_CITY_TEMPLATE = "🏠 **{room_type}**\n   🏨 Hotel: {hotel_name} ({city})\n".format_map
+_ROOM_TYPE_PRICES_TEMPLATE = (
+    "   📊 Available: {available_count} rooms\n"
+    "   💰 Price Range: ${min_price:.2f} - ${max_price:.2f}\n"
+    "   📈 Average Price: ${avg_price:.2f}/night\n\n"
+).format_map
+_DATED_ROOM_HEAD = (
+    "🏨 **{hotel_name}** ({stars} stars)\n"
+    "   📍 {address}, {city}\n"
+    "   🏠 Room {room_number} - {room_type}\n"
+    "   👥 Capacity: {capacity} guests\n"
+    "   💰 ${price_per_night}/night × {nights} nights = ${total_cost:.2f}\n"
+    "   🆔 Room ID: {id}\n"
+).format_map
+_DATED_ROOM_TAIL = "   📋 To book: use room_id {id}\n\n".format_map
+_HOTEL_HEADER_TEMPLATE = "🏨 **{name}** ({id_label}: {id})\n📍 Address: {address}, {city}\n⭐ Stars: {stars}/5\n".format
+_HOTEL_COUNTS_TEMPLATE = "🏠 Total Rooms: {total_rooms}\n✅ Available Rooms: {available_rooms}\n".format_map
+_DETAIL_ROOM_TEMPLATE = "  • Room {room_number} ({room_type}) - ${price_per_night}/night (Capacity: {capacity})\n".format_map
+_TYPE_ROOM_TEMPLATE = "  • Room {room_number} - ${price_per_night}/night (Capacity: {capacity})\n".format_map
+_ROOM_TYPE_HEADER_TEMPLATE = "\n🏠 **{room_type}** ({count} available)\n".format
+_PAGE_FOOTER_TEMPLATE = "Showing {first}-{last} of {total}. Call again with page={next_page} to see more.\n".format
+_MORE_ROOMS_TEMPLATE = "  • ... and {count} more {room_type} rooms\n".format
+
+
+def _page_offset(page: int) -> int:
+    """Row offset of a 1-based result page"""
+    return (max(page, 1) - 1) * _PAGE_SIZE
+
+
+def _append_page_footer(parts: List[str], rows: List[Dict], page: int) -> None:
+    """Tell the model how to fetch the next page when more rows match"""
+    shown_upto = _page_offset(page) + len(rows)
+    total = rows[0]['total_count']
+    if shown_upto < total:
+        parts.append(_PAGE_FOOTER_TEMPLATE(first=_page_offset(page) + 1, last=shown_upto, total=total, next_page=max(page, 1) + 1))
+
+
+def _append_hotel(parts: List[str], head, tail, hotel: Dict) -> None:
+    """Append one hotel entry of a search listing to parts"""
+    parts.append(head(hotel))
+    if hotel.get('description'):
+        parts.append(_DESCRIPTION_LINE(hotel))
+    parts.append(tail(hotel))
+    if hotel.get('amenities'):
+        parts.append(_AMENITIES_LINE(', '.join(hotel['amenities'])))
+    parts.append("\n")
+
+
+def _append_hotel_header(parts: List[str], hotel: Dict, id_label: str) -> None:
+    """Append the contact and room-count header of a single hotel to parts"""
+    parts.append(_HOTEL_HEADER_TEMPLATE(id_label=id_label, **hotel))
+    if hotel.get('description'):
+        parts.append(f"📝 Description: {hotel['description']}\n")
+    if hotel.get('phone_number'):
+        parts.append(f"📞 Phone: {hotel['phone_number']}\n")
+    if hotel.get('email'):
+        parts.append(f"📧 Email: {hotel['email']}\n")
+    parts.append(_HOTEL_COUNTS_TEMPLATE(hotel))
+    if hotel.get('amenities'):
+        parts.append(f"🎯 Amenities: {', '.join(hotel['amenities'])}\n")
+    parts.append("\n")
+
+# Booking contact validation, mirroring the CHECK constraints on bookings
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_RE = re.compile(r'^\+?[0-9\s\-()]{7,20}$')
+
+
+def _parse_date(value: str) -> date:
+    """Parse a YYYY-MM-DD date; raises ValueError like strptime"""
+    return date.fromisoformat(value)
+
+
 # Define the state of our graph
 class State(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
     user_info: Dict[str, Any]  # Store user preferences, last searched hotels, etc.
+    summary: str  # Rolling summary of the turns folded out of messages
 
-class HotelBotTools:
-    """Tools for the hotel chatbot to interact with the database"""
-    
-    def __init__(self):
-        self.search_service = HotelSearchService()
-        self.search_service.connect()
-    
-    def __del__(self):
-        """Cleanup database connections"""
-        try:
-            self.search_service.disconnect()
-        except:
-            pass
 
-    @tool
-    def search_hotels_by_city(city: str) -> str:
-        """Search for hotels in a specific city. Use this when user asks about hotels in a particular location."""
-        try:
-            tools_instance = HotelBotTools()
-            hotels = tools_instance.search_service.search_hotels_by_city(city)
-            
-            if not hotels:
-                return f"No hotels found in {city}. Please try another city."
-            
-            result = f"Found {len(hotels)} hotels in {city}:\n\n"
-            for hotel in hotels:
-                result += f"🏨 **{hotel['name']}** (Hotel ID: {hotel['id']})\n"
-                result += f"   📍 {hotel['address']}, {hotel['city']}\n"
-                result += f"   ⭐ Stars: {hotel['stars']}/5\n"
-                if hotel.get('description'):
-                    result += f"   📝 {hotel['description']}\n"
-                result += f"   🏠 Total Rooms: {hotel['total_rooms']}\n"
-                result += f"   ✅ Available Rooms: {hotel['available_rooms']}\n"
-                if hotel.get('amenities'):
-                    result += f"   🎯 Amenities: {', '.join(hotel['amenities'])}\n"
-                result += "\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error searching hotels: {str(e)}"
-    
-    @tool
-    def search_hotels_by_rating(min_rating: str) -> str:
-        """Search for hotels with minimum rating. Rating should be between 1.0 and 5.0."""
-        try:
-            rating = float(min_rating)
-            if rating < 1.0 or rating > 5.0:
-                return "Rating must be between 1.0 and 5.0"
-            
-            tools_instance = HotelBotTools()
-            hotels = tools_instance.search_service.search_hotels_by_rating(rating)
-            
-            if not hotels:
-                return f"No hotels found with rating {rating} or higher."
-            
-            result = f"Found {len(hotels)} hotels with {rating}+ stars:\n\n"
-            for hotel in hotels:
-                result += f"🏨 **{hotel['name']}** (Hotel ID: {hotel['id']})\n"
-                result += f"   📍 {hotel['city']}\n"
-                result += f"   ⭐ Stars: {hotel['stars']}/5\n"
-                if hotel.get('description'):
-                    result += f"   📝 {hotel['description']}\n"
-                result += f"   🏠 Available Rooms: {hotel['available_rooms']}\n"
-                if hotel.get('amenities'):
-                    result += f"   🎯 Amenities: {', '.join(hotel['amenities'])}\n"
-                result += "\n"
-            
-            return result
-            
-        except ValueError:
-            return "Invalid rating format. Please provide a number between 1.0 and 5.0"
-        except Exception as e:
-            return f"Error searching hotels by rating: {str(e)}"
-    
-    @tool
-    def get_available_rooms(filters: str = "") -> str:
-        """Get available rooms with optional filters. Pass filters as a string like 'hotel_id:1,room_type:single,max_price:200'"""
-        try:
-            tools_instance = HotelBotTools()
-            
-            # Parse filters
-            hotel_id_int = None
-            room_type = None
-            max_price_float = None
-            
-            if filters:
-                for filter_item in filters.split(','):
-                    if ':' in filter_item:
-                        key, value = filter_item.split(':', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        
-                        if key == 'hotel_id' and value.isdigit():
-                            hotel_id_int = int(value)
-                        elif key == 'room_type':
-                            room_type = value
-                        elif key == 'max_price':
-                            try:
-                                max_price_float = float(value)
-                            except ValueError:
-                                pass
-            
-            rooms = tools_instance.search_service.get_available_rooms(
-                hotel_id=hotel_id_int,
+# Older turns are folded into the summary once a thread holds more than memory_window
+# exchanges (two messages each), which keeps checkpointed state a bounded size
+_SUMMARIZE_AFTER_MESSAGES = CHATBOT_CONFIG["memory_window"] * 2
+_KEEP_RECENT_MESSAGES = CHATBOT_CONFIG["memory_window"]
+# Token budget for earlier turns sent with each request; the current turn is always sent whole
+_HISTORY_TOKEN_BUDGET = 3000
+_SUMMARY_TAG = "memory_summary"
+# Replaces the reply when the model keeps calling tools without answering
+_TOOL_LOOP_REPLY = "I wasn't able to finish looking that up. Could you rephrase or narrow down your request?"
+
+
+def _last_human_index(messages: List[BaseMessage], upto: int) -> int:
+    """Index of the last HumanMessage at or before upto, or -1"""
+    for i in range(min(upto, len(messages) - 1), -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return -1
+
+
+def _turn_tool_calls(messages: List[BaseMessage]) -> tuple:
+    """Tool rounds made since the last user message and the (name, args) keys they called"""
+    start = max(_last_human_index(messages, len(messages) - 1), 0)
+    rounds, seen = 0, set()
+    for message in messages[start:]:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            rounds += 1
+            seen.update(_tool_call_key(call) for call in message.tool_calls)
+    return rounds, seen
+
+
+def _tool_call_key(call: Dict) -> tuple:
+    return call["name"], json.dumps(call["args"], sort_keys=True, default=str)
+
+
+# Email addresses and phone-like digit runs anywhere in a message
+_CONTACT_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}|\+?[0-9][0-9\s\-()]{6,}')
+
+
+def _cacheable(state: State) -> bool:
+    """Whether a turn may use the response cache: no summary, tool calls, tool results or contact details"""
+    if state.get("summary"):
+        return False
+    for message in state["messages"]:
+        if isinstance(message, ToolMessage) or getattr(message, "tool_calls", None):
+            return False
+        if isinstance(message, HumanMessage) and _CONTACT_RE.search(str(message.content)):
+            return False
+    return True
+
+
+def _recent_history(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Trim earlier turns to the token budget, keeping tool calls next to their results"""
+    current = max(_last_human_index(messages, len(messages) - 1), 0)
+    history = trim_messages(
+        messages[:current],
+        max_tokens=_HISTORY_TOKEN_BUDGET,
+        strategy="last",
+        token_counter=count_tokens_approximately,
+        start_on="human"
+    )
+    return history + messages[current:]
+
+
+# Shared by every tool so each call reuses the pooled database connections;
+# the database module closes the pool at process exit
+_SEARCH_SERVICE = HotelSearchService()
+_SEARCH_SERVICE.connect()
+# Cached city and room-type results come from the summary views, so a refresh drops them
+_SEARCH_SERVICE.add_refresh_listener(_invalidate_search_cache)
+
+
+@tool
+def search_hotels_by_city(city: str, page: int = 1) -> str:
+    """Search for hotels in a specific city. Use this when user asks about hotels in a particular location. Results are paged; pass page to see more."""
+    try:
+        hotels = _cached(
+            _cache_key('search_hotels_by_city', city, page),
+            lambda: _SEARCH_SERVICE.search_hotels_by_city(city, limit=_PAGE_SIZE, offset=_page_offset(page))
+        )
+        
+        if not hotels:
+            return f"No hotels found in {city}. Please try another city."
+        
+        parts = [f"Found {hotels[0]['total_count']} hotels in {city}:\n\n"]
+        for hotel in hotels:
+            _append_hotel(parts, _CITY_HOTEL_HEAD, _CITY_HOTEL_TAIL, hotel)
+        _append_page_footer(parts, hotels, page)
+        
+        return "".join(parts)
+        
+    except Exception as e:
+        return f"Error searching hotels: {str(e)}"
+
+
+@tool
+def search_hotels_by_rating(min_rating: str, page: int = 1) -> str:
+    """Search for hotels with minimum rating. Rating should be between 1.0 and 5.0. Results are paged; pass page to see more."""
+    try:
+        rating = float(min_rating)
+        if rating < 1.0 or rating > 5.0:
+            return "Rating must be between 1.0 and 5.0"
+        
+        hotels = _cached(
+            _cache_key('search_hotels_by_rating', rating, page),
+            lambda: _SEARCH_SERVICE.search_hotels_by_rating(rating, limit=_PAGE_SIZE, offset=_page_offset(page))
+        )
+        
+        if not hotels:
+            return f"No hotels found with rating {rating} or higher."
+        
+        parts = [f"Found {hotels[0]['total_count']} hotels with {rating}+ stars:\n\n"]
+        for hotel in hotels:
+            _append_hotel(parts, _RATED_HOTEL_HEAD, _RATED_HOTEL_TAIL, hotel)
+        _append_page_footer(parts, hotels, page)
+        
+        return "".join(parts)
+        
+    except ValueError:
+        return "Invalid rating format. Please provide a number between 1.0 and 5.0"
+    except Exception as e:
+        return f"Error searching hotels by rating: {str(e)}"
+
+
+@tool
+def get_available_rooms(hotel_id: Optional[int] = None, room_type: Optional[str] = None, max_price: Optional[float] = None) -> str:
+    """Get available rooms, optionally filtered by hotel ID, room type (e.g. single, double, suite) and maximum price per night."""
+    try:
+        rooms = _cached(
+            _cache_key('get_available_rooms', hotel_id, room_type, max_price),
+            lambda: _SEARCH_SERVICE.get_available_rooms(
+                hotel_id=hotel_id,
                 room_type=room_type,
-                max_price=max_price_float
+                max_price=max_price
             )
-            
-            if not rooms:
-                return "No available rooms found with the specified criteria."
-            
-            result = f"Found {len(rooms)} available rooms:\n\n"
-            for room in rooms:
-                result += f"🏠 **Room {room['room_number']}** - {room['room_type']}\n"
-                result += f"   🏨 Hotel: {room['hotel_name']}\n"
-                result += f"   📍 Location: {room['city']}\n"
-                result += f"   💰 Price: ${room['price_per_night']}/night\n"
-                result += f"   👥 Capacity: {room['capacity']} guests\n"
-                result += f"   🆔 Room ID: {room['id']}\n"
-                if room.get('amenities'):
-                    result += f"   🎯 Amenities: {', '.join(room['amenities'])}\n"
-                result += "\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error fetching available rooms: {str(e)}"
-    
-    @tool
-    def get_room_types_and_prices(hotel_id: str = "") -> str:
-        """Get room types and their price ranges. Optionally filter by hotel_id."""
-        try:
-            tools_instance = HotelBotTools()
-            
-            hotel_id_int = int(hotel_id) if hotel_id and hotel_id.isdigit() else None
-            
-            room_types = tools_instance.search_service.get_room_types_and_prices(hotel_id_int)
-            
-            if not room_types:
-                return "No room types found."
-            
-            result = "Available room types and prices:\n\n"
-            for room_type in room_types:
-                result += f"🏠 **{room_type['room_type']}**\n"
-                if hotel_id_int:
-                    result += f"   🏨 Hotel: {room_type['hotel_name']}\n"
-                else:
-                    result += f"   🏨 Hotel: {room_type['hotel_name']} ({room_type['city']})\n"
-                result += f"   📊 Available: {room_type['available_count']} rooms\n"
-                result += f"   💰 Price Range: ${room_type['min_price']:.2f} - ${room_type['max_price']:.2f}\n"
-                result += f"   📈 Average Price: ${room_type['avg_price']:.2f}/night\n\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error fetching room types: {str(e)}"
-    
-    @tool
-    def search_hotels_by_price_range(min_price: str, max_price: str) -> str:
-        """Search hotels with rooms in a specific price range per night."""
-        try:
-            min_price_float = float(min_price)
-            max_price_float = float(max_price)
-            
-            if min_price_float > max_price_float:
-                return "Minimum price cannot be greater than maximum price."
-            
-            tools_instance = HotelBotTools()
-            hotels = tools_instance.search_service.search_hotels_by_price_range(min_price_float, max_price_float)
-            
-            if not hotels:
-                return f"No hotels found with rooms in the price range ${min_price} - ${max_price}."
-            
-            result = f"Found {len(hotels)} hotels with rooms in ${min_price} - ${max_price} range:\n\n"
-            for hotel in hotels:
-                result += f"🏨 **{hotel['name']}**\n"
-                result += f"   📍 {hotel['city']}\n"
-                result += f"   ⭐ Stars: {hotel['stars']}/5\n"
-                if hotel.get('description'):
-                    result += f"   📝 {hotel['description']}\n"
-                result += f"   💰 Room Price Range: ${hotel['min_room_price']:.2f} - ${hotel['max_room_price']:.2f}\n"
-                result += f"   🏠 Available Rooms: {hotel['total_rooms']}\n"
-                if hotel.get('amenities'):
-                    result += f"   🎯 Amenities: {', '.join(hotel['amenities'])}\n"
-                result += "\n"
-            
-            return result
-            
-        except ValueError:
-            return "Invalid price format. Please provide valid numbers."
-        except Exception as e:
-            return f"Error searching hotels by price range: {str(e)}"
-    
-    @tool
-    def get_hotel_details(hotel_id: str) -> str:
-        """Get detailed information about a specific hotel including all its rooms."""
-        try:
-            hotel_id_int = int(hotel_id)
-            
-            tools_instance = HotelBotTools()
-            
-            # Get hotel info using service layer
-            hotel = tools_instance.search_service.get_hotel_by_id(hotel_id_int)
-            
-            if not hotel:
-                return f"Hotel with ID {hotel_id} not found."
-            
-            # Get room details
-            rooms = tools_instance.search_service.get_available_rooms(hotel_id=hotel_id_int)
-            
-            result = f"🏨 **{hotel['name']}** (ID: {hotel['id']})\n"
-            result += f"📍 Address: {hotel['address']}, {hotel['city']}\n"
-            result += f"⭐ Stars: {hotel['stars']}/5\n"
-            if hotel.get('description'):
-                result += f"📝 Description: {hotel['description']}\n"
-            if hotel.get('phone_number'):
-                result += f"📞 Phone: {hotel['phone_number']}\n"
-            if hotel.get('email'):
-                result += f"📧 Email: {hotel['email']}\n"
-            result += f"🏠 Total Rooms: {hotel['total_rooms']}\n"
-            result += f"✅ Available Rooms: {hotel['available_rooms']}\n"
-            if hotel.get('amenities'):
-                result += f"🎯 Amenities: {', '.join(hotel['amenities'])}\n"
-            result += "\n"
-            
-            if rooms:
-                result += "**Available Rooms:**\n"
-                for room in rooms:
-                    result += f"  • Room {room['room_number']} ({room['room_type']}) - ${room['price_per_night']}/night (Capacity: {room['capacity']})\n"
-            else:
-                result += "No rooms currently available.\n"
-            
-            return result
-            
-        except ValueError:
-            return "Invalid hotel ID format. Please provide a valid number."
-        except Exception as e:
-            return f"Error fetching hotel details: {str(e)}"
+        )
+        
+        if not rooms:
+            return "No available rooms found with the specified criteria."
+        
+        parts = [f"Found {len(rooms)} available rooms:\n\n"]
+        for room in rooms:
+            parts.append(_ROOM_TEMPLATE(room))
+            if room.get('amenities'):
+                parts.append(_AMENITIES_LINE(', '.join(room['amenities'])))
+            parts.append("\n")
+        
+        return "".join(parts)
+        
+    except Exception as e:
+        return f"Error fetching available rooms: {str(e)}"
 
-    @tool
-    def search_hotel_by_name(hotel_name: str) -> str:
-        """Search for a hotel by its name and get its details and available rooms."""
-        try:
-            tools_instance = HotelBotTools()
-            
-            # Search for hotel by name using service layer
-            hotel = tools_instance.search_service.search_hotel_by_name(hotel_name)
-            
-            if not hotel:
-                return f"No hotel found with name '{hotel_name}'. Please try a different name or search by city."
-            
-            # Get available rooms for this hotel
-            rooms = tools_instance.search_service.get_available_rooms(hotel_id=hotel['id'])
-            
-            result = f"🏨 **{hotel['name']}** (Hotel ID: {hotel['id']})\n"
-            result += f"📍 Address: {hotel['address']}, {hotel['city']}\n"
-            result += f"⭐ Stars: {hotel['stars']}/5\n"
-            if hotel.get('description'):
-                result += f"📝 Description: {hotel['description']}\n"
-            if hotel.get('phone_number'):
-                result += f"📞 Phone: {hotel['phone_number']}\n"
-            if hotel.get('email'):
-                result += f"📧 Email: {hotel['email']}\n"
-            result += f"🏠 Total Rooms: {hotel['total_rooms']}\n"
-            result += f"✅ Available Rooms: {hotel['available_rooms']}\n"
-            if hotel.get('amenities'):
-                result += f"🎯 Amenities: {', '.join(hotel['amenities'])}\n"
-            result += "\n"
-            
-            if rooms:
-                result += "**Available Room Types:**\n"
-                room_types = {}
-                for room in rooms:
-                    room_type = room['room_type']
-                    if room_type not in room_types:
-                        room_types[room_type] = []
-                    room_types[room_type].append(room)
-                
-                for room_type, type_rooms in room_types.items():
-                    result += f"\n🏠 **{room_type}** ({len(type_rooms)} available)\n"
-                    for room in type_rooms[:3]:  # Show first 3 rooms of each type
-                        result += f"  • Room {room['room_number']} - ${room['price_per_night']}/night (Capacity: {room['capacity']})\n"
-                    if len(type_rooms) > 3:
-                        result += f"  • ... and {len(type_rooms) - 3} more {room_type} rooms\n"
-            else:
-                result += "No rooms currently available at this hotel.\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error searching hotel by name: {str(e)}"
 
-    @tool
-    def check_room_availability_by_dates(room_id: str, check_in_date: str, check_out_date: str) -> str:
-        """Check if a specific room is available for given dates. Dates should be in YYYY-MM-DD format."""
-        try:
-            tools_instance = HotelBotTools()
-            
-            # Parse dates
-            try:
-                check_in = datetime.strptime(check_in_date, "%Y-%m-%d").date()
-                check_out = datetime.strptime(check_out_date, "%Y-%m-%d").date()
-            except ValueError:
-                return "Invalid date format. Please use YYYY-MM-DD format (e.g., 2024-12-25)."
-            
-            # Validate dates
-            if check_in >= check_out:
-                return "Check-out date must be after check-in date."
-            
-            if check_in < date.today():
-                return "Check-in date cannot be in the past."
-            
-            room_id_int = int(room_id)
-            
-            tools_instance = HotelBotTools()
-            
-            # First check if room exists and is generally available
-            room = tools_instance.search_service.get_room_by_id(room_id_int)
-            
-            if not room:
-                return f"Room with ID {room_id} not found or not available."
-            
-            # Check for conflicting bookings
-            conflict_count = tools_instance.search_service.check_booking_conflict(room_id_int, check_in, check_out)
-            
-            if conflict_count > 0:
-                return f"❌ Room {room['room_number']} at {room['hotel_name']} is not available for {check_in_date} to {check_out_date}. Please choose different dates or another room."
-            
-            # Calculate stay details
-            nights = (check_out - check_in).days
-            total_cost = float(room['price_per_night']) * nights
-            
-            result = f"✅ Room {room['room_number']} at {room['hotel_name']} is available!\n\n"
-            result += f"📅 Check-in: {check_in_date}\n"
-            result += f"📅 Check-out: {check_out_date}\n"
-            result += f"🛏️ Nights: {nights}\n"
-            result += f"🏠 Room Type: {room['room_type']}\n"
-            result += f"👥 Capacity: {room['capacity']} guests\n"
-            result += f"💰 Price per night: ${room['price_per_night']}\n"
-            result += f"💵 Total cost: ${total_cost:.2f}\n\n"
-            result += f"🏨 Hotel: {room['hotel_name']}\n"
-            result += f"📍 Location: {room['address']}, {room['city']}\n"
-            if room.get('phone_number'):
-                result += f"📞 Phone: {room['phone_number']}\n"
-            result += f"\nTo book this room, use the book_room tool with room_id: {room_id}"
-            
-            return result
-            
-        except ValueError:
-            return "Invalid room ID format. Please provide a valid number."
-        except Exception as e:
-            return f"Error checking room availability: {str(e)}"
+@tool
+def get_room_types_and_prices(hotel_id: str = "") -> str:
+    """Get room types and their price ranges. Optionally filter by hotel_id."""
+    try:
+        hotel_id_int = int(hotel_id) if hotel_id and hotel_id.isdigit() else None
+        
+        room_types = _cached(
+            _cache_key('get_room_types_and_prices', hotel_id_int),
+            lambda: _SEARCH_SERVICE.get_room_types_and_prices(hotel_id_int)
+        )
+        
+        if not room_types:
+            return "No room types found."
+        
+        hotel_template = _ROOM_TYPE_HOTEL_TEMPLATE if hotel_id_int else _ROOM_TYPE_HOTEL_CITY_TEMPLATE
+        parts = ["Available room types and prices:\n\n"]
+        parts.extend(
+            hotel_template(room_type) + _ROOM_TYPE_PRICES_TEMPLATE(room_type)
+            for room_type in room_types
+        )
+        
+        return "".join(parts)
+        
+    except Exception as e:
+        return f"Error fetching room types: {str(e)}"
 
-    @tool
-    def book_room(room_id: str, guest_name: str, guest_email: str, guest_phone: str, check_in_date: str, check_out_date: str) -> str:
-        """Book a room for a guest. All parameters are required. Dates should be in YYYY-MM-DD format."""
-        try:
-            tools_instance = HotelBotTools()
-            
-            # Validate inputs
-            if not all([room_id, guest_name, guest_email, guest_phone, check_in_date, check_out_date]):
-                return "All booking details are required: room_id, guest_name, guest_email, guest_phone, check_in_date, check_out_date."
-            
-            # Validate email format
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, guest_email):
-                return "Invalid email format. Please provide a valid email address."
-            
-            # Validate phone format
-            phone_pattern = r'^\+?[0-9\s\-()]{7,20}$'
-            if not re.match(phone_pattern, guest_phone):
-                return "Invalid phone format. Please provide a valid phone number."
-            
-            # Parse dates
-            try:
-                check_in = datetime.strptime(check_in_date, "%Y-%m-%d").date()
-                check_out = datetime.strptime(check_out_date, "%Y-%m-%d").date()
-            except ValueError:
-                return "Invalid date format. Please use YYYY-MM-DD format (e.g., 2024-12-25)."
-            
-            # Validate dates
-            if check_in >= check_out:
-                return "Check-out date must be after check-in date."
-            
-            if check_in < date.today():
-                return "Check-in date cannot be in the past."
-            
-            room_id_int = int(room_id)
-            
-            tools_instance = HotelBotTools()
-            
-            # Check if room is still available for the requested dates
-            room = tools_instance.search_service.get_room_by_id(room_id_int)
-            
-            if not room:
-                return f"Room with ID {room_id} not found or not available."
-            
-            # Check for conflicting bookings
-            conflict_count = tools_instance.search_service.check_booking_conflict(room_id_int, check_in, check_out)
-            
-            if conflict_count > 0:
-                return f"❌ Room {room['room_number']} at {room['hotel_name']} is not available for {check_in_date} to {check_out_date}. Please choose different dates or another room."
 
-            
-            # Calculate booking details
-            nights = (check_out - check_in).days
-            total_amount = float(room['price_per_night']) * nights
-            
-            # Create booking using service layer
-            booking_id = tools_instance.search_service.create_booking(
-                room_id_int, guest_name, guest_email, guest_phone, check_in, check_out, total_amount
+@tool
+def search_hotels_by_price_range(min_price: str, max_price: str, page: int = 1) -> str:
+    """Search hotels with rooms in a specific price range per night. Results are paged; pass page to see more."""
+    try:
+        min_price_float = float(min_price)
+        max_price_float = float(max_price)
+        
+        if min_price_float > max_price_float:
+            return "Minimum price cannot be greater than maximum price."
+        
+        hotels = _cached(
+            _cache_key('search_hotels_by_price_range', min_price_float, max_price_float, page),
+            lambda: _SEARCH_SERVICE.search_hotels_by_price_range(
+                min_price_float, max_price_float, limit=_PAGE_SIZE, offset=_page_offset(page)
             )
-            
-            if not booking_id:
-                return "Error creating booking. Please try again."
-            
-            # Update room availability if booking is for current dates
-            if check_in <= date.today() <= check_out:
-                tools_instance.search_service.update_room_availability(room_id_int, False)
-            
-            # Generate booking confirmation
-            result = f"🎉 Booking Confirmed! 🎉\n\n"
-            result += f"📋 Booking ID: {booking_id}\n"
-            result += f"👤 Guest: {guest_name}\n"
-            result += f"📧 Email: {guest_email}\n"
-            result += f"📞 Phone: {guest_phone}\n\n"
-            result += f"🏨 Hotel: {room['hotel_name']}\n"
-            result += f"📍 Address: {room['address']}, {room['city']}\n"
-            result += f"🏠 Room: {room['room_number']} ({room['room_type']})\n"
-            result += f"👥 Capacity: {room['capacity']} guests\n\n"
-            result += f"📅 Check-in: {check_in_date}\n"
-            result += f"📅 Check-out: {check_out_date}\n"
-            result += f"🛏️ Nights: {nights}\n"
-            result += f"💰 Rate: ${room['price_per_night']}/night\n"
-            result += f"💵 Total Amount: ${total_amount:.2f}\n\n"
-            if room.get('hotel_email'):
-                result += f"For any inquiries, contact the hotel at {room['hotel_email']}"
-                if room.get('phone_number'):
-                    result += f" or {room['phone_number']}"
-            result += f"\n\nThank you for choosing {room['hotel_name']}! 🌟"
-            
-            return result
-            
-        except ValueError:
-            return "Invalid room ID format. Please provide a valid number."
-        except Exception as e:
-            return f"Error booking room: {str(e)}"
+        )
+        
+        if not hotels:
+            return f"No hotels found with rooms in the price range ${min_price} - ${max_price}."
+        
+        parts = [f"Found {hotels[0]['total_count']} hotels with rooms in ${min_price} - ${max_price} range:\n\n"]
+        for hotel in hotels:
+            _append_hotel(parts, _PRICED_HOTEL_HEAD, _PRICED_HOTEL_TAIL, hotel)
+        _append_page_footer(parts, hotels, page)
+        
+        return "".join(parts)
+        
+    except ValueError:
+        return "Invalid price format. Please provide valid numbers."
+    except Exception as e:
+        return f"Error searching hotels by price range: {str(e)}"
+
+
+@tool
+def get_hotel_details(hotel_id: str) -> str:
+    """Get detailed information about a specific hotel including all its rooms."""
+    try:
+        hotel_id_int = int(hotel_id)
+        
+        # Hotel info and its available rooms come back in one row
+        hotel = _cached(
+            _cache_key('get_hotel_by_id', hotel_id_int),
+            lambda: _HOTEL_LOOKUP.load(hotel_id_int)
+        )
+        
+        if not hotel:
+            return f"Hotel with ID {hotel_id} not found."
+        
+        parts = []
+        _append_hotel_header(parts, hotel, "ID")
+        
+        if hotel['rooms']:
+            parts.append("**Available Rooms:**\n")
+            parts.extend(_DETAIL_ROOM_TEMPLATE(room) for room in hotel['rooms'])
+        else:
+            parts.append("No rooms currently available.\n")
+        
+        return "".join(parts)
+        
+    except ValueError:
+        return "Invalid hotel ID format. Please provide a valid number."
+    except Exception as e:
+        return f"Error fetching hotel details: {str(e)}"
 
-    @tool
-    def get_booking_details(booking_id: str) -> str:
-        """Get details of a specific booking by booking ID."""
+
+@tool
+def search_hotel_by_name(hotel_name: str) -> str:
+    """Search for a hotel by its name and get its details and available rooms."""
+    try:
+        # Hotel info and a preview of its rooms per type come back in one row
+        matches = _cached(
+            _cache_key('search_hotel_by_name', hotel_name),
+            lambda: _SEARCH_SERVICE.db.execute_prepared("lg_hotel_by_name", (f"%{hotel_name}%",))
+        )
+        hotel = matches[0] if matches else None
+        
+        if not hotel:
+            return f"No hotel found with name '{hotel_name}'. Please try a different name or search by city."
+        
+        parts = []
+        _append_hotel_header(parts, hotel, "Hotel ID")
+        
+        if hotel['room_types']:
+            parts.append("**Available Room Types:**\n")
+            # Rooms arrive grouped per type, cheapest type first
+            for group in hotel['room_types']:
+                parts.append(_ROOM_TYPE_HEADER_TEMPLATE(room_type=group['room_type'], count=group['count']))
+                parts.extend(_TYPE_ROOM_TEMPLATE(room) for room in group['rooms'])
+                if group['count'] > 3:
+                    parts.append(_MORE_ROOMS_TEMPLATE(room_type=group['room_type'], count=group['count'] - 3))
+        else:
+            parts.append("No rooms currently available at this hotel.\n")
+        
+        return "".join(parts)
+        
+    except Exception as e:
+        return f"Error searching hotel by name: {str(e)}"
+
+
+@tool
+def check_room_availability_by_dates(room_id: str, check_in_date: str, check_out_date: str) -> str:
+    """Check if a specific room is available for given dates. Dates should be in YYYY-MM-DD format."""
+    try:
+        # Parse dates
         try:
-            tools_instance = HotelBotTools()
-            booking_id_int = int(booking_id)
-            
-            booking = tools_instance.search_service.get_booking_by_id(booking_id_int)
-            
-            if not booking:
-                return f"Booking with ID {booking_id} not found."
-            
-            # Calculate nights
-            nights = (booking['check_out'] - booking['check_in']).days
-            
-            result = f"📋 Booking Details (ID: {booking_id})\n\n"
-            result += f"👤 Guest: {booking['guest_name']}\n"
-            result += f"📧 Email: {booking['guest_email']}\n"
-            result += f"📞 Phone: {booking['guest_phone']}\n\n"
-            result += f"🏨 Hotel: {booking['hotel_name']}\n"
-            result += f"📍 Address: {booking['address']}, {booking['city']}\n"
-            result += f"🏠 Room: {booking['room_number']} ({booking['room_type']})\n"
-            result += f"👥 Capacity: {booking['capacity']} guests\n\n"
-            result += f"📅 Check-in: {booking['check_in']}\n"
-            result += f"📅 Check-out: {booking['check_out']}\n"
-            result += f"🛏️ Nights: {nights}\n"
-            result += f"💰 Rate: ${booking['price_per_night']}/night\n"
-            result += f"💵 Total Amount: ${booking['total_amount']:.2f}\n"
-            result += f"📊 Status: {booking['status'].upper()}\n"
-            result += f"📅 Booked on: {booking['created_at'].strftime('%Y-%m-%d %H:%M')}\n\n"
-            
-            if booking.get('hotel_email'):
-                result += f"For inquiries, contact: {booking['hotel_email']}"
-                if booking.get('phone_number'):
-                    result += f" or {booking['phone_number']}"
-            
-            return result
-            
+            check_in = _parse_date(check_in_date)
+            check_out = _parse_date(check_out_date)
         except ValueError:
-            return "Invalid booking ID format. Please provide a valid number."
-        except Exception as e:
-            return f"Error retrieving booking details: {str(e)}"
+            return "Invalid date format. Please use YYYY-MM-DD format (e.g., 2024-12-25)."
+        
+        # Validate dates
+        if check_in >= check_out:
+            return "Check-out date must be after check-in date."
+        
+        if check_in < date.today():
+            return "Check-in date cannot be in the past."
+        
+        room_id_int = int(room_id)
+        
+        # Look up the room and count conflicting bookings concurrently
+        service = _SEARCH_SERVICE
+        conflicts = _QUERY_EXECUTOR.submit(service.check_booking_conflict, room_id_int, check_in, check_out)
+        room = _cached(
+            _cache_key('get_room_by_id', room_id_int),
+            lambda: service.get_room_by_id(room_id_int)
+        )
+        conflict_count = conflicts.result()
+        
+        if not room:
+            return f"Room with ID {room_id} not found or not available."
+        
+        if conflict_count > 0:
+            return f"❌ Room {room['room_number']} at {room['hotel_name']} is not available for {check_in_date} to {check_out_date}. Please choose different dates or another room."
+        
+        # Calculate stay details
+        nights = (check_out - check_in).days
+        total_cost = float(room['price_per_night']) * nights
+        
+        parts = [f"✅ Room {room['room_number']} at {room['hotel_name']} is available!\n\n"]
+        parts.append(f"📅 Check-in: {check_in_date}\n")
+        parts.append(f"📅 Check-out: {check_out_date}\n")
+        parts.append(f"🛏️ Nights: {nights}\n")
+        parts.append(f"🏠 Room Type: {room['room_type']}\n")
+        parts.append(f"👥 Capacity: {room['capacity']} guests\n")
+        parts.append(f"💰 Price per night: ${room['price_per_night']}\n")
+        parts.append(f"💵 Total cost: ${total_cost:.2f}\n\n")
+        parts.append(f"🏨 Hotel: {room['hotel_name']}\n")
+        parts.append(f"📍 Location: {room['address']}, {room['city']}\n")
+        if room.get('phone_number'):
+            parts.append(f"📞 Phone: {room['phone_number']}\n")
+        parts.append(f"\nTo book this room, use the book_room tool with room_id: {room_id}")
+        
+        return "".join(parts)
+        
+    except ValueError:
+        return "Invalid room ID format. Please provide a valid number."
+    except Exception as e:
+        return f"Error checking room availability: {str(e)}"
+
 
-    @tool
-    def cancel_booking(booking_id: str, reason: str = "Guest requested") -> str:
-        """Cancel a booking by booking ID. Optionally provide a reason for cancellation."""
+@tool
+def book_room(room_id: str, guest_name: str, guest_email: str, guest_phone: str, check_in_date: str, check_out_date: str) -> str:
+    """Book a room for a guest. All parameters are required. Dates should be in YYYY-MM-DD format."""
+    try:
+        # Validate inputs
+        if not all([room_id, guest_name, guest_email, guest_phone, check_in_date, check_out_date]):
+            return "All booking details are required: room_id, guest_name, guest_email, guest_phone, check_in_date, check_out_date."
+        
+        # Validate email format
+        if not _EMAIL_RE.match(guest_email):
+            return "Invalid email format. Please provide a valid email address."
+        
+        # Validate phone format
+        if not _PHONE_RE.match(guest_phone):
+            return "Invalid phone format. Please provide a valid phone number."
+        
+        # Parse dates
         try:
-            tools_instance = HotelBotTools()
-            booking_id_int = int(booking_id)
-            
-            # Get booking details first
-            booking = tools_instance.search_service.get_confirmed_booking_by_id(booking_id_int)
-            
-            if not booking:
-                return f"Booking with ID {booking_id} not found or already cancelled."
-            
-            # Update booking status
-            tools_instance.search_service.cancel_booking(booking_id_int)
-            
-            # If booking was for current dates, make room available again
-            if booking['check_in'] <= date.today() <= booking['check_out']:
-                tools_instance.search_service.update_room_availability(booking['room_id'], True)
-            
-            result = f"❌ Booking Cancelled\n\n"
-            result += f"📋 Booking ID: {booking_id}\n"
-            result += f"👤 Guest: {booking['guest_name']}\n"
-            result += f"🏨 Hotel: {booking['hotel_name']}\n"
-            result += f"🏠 Room: {booking['room_number']} ({booking['room_type']})\n"
-            result += f"📅 Original dates: {booking['check_in']} to {booking['check_out']}\n"
-            result += f"💵 Refund amount: ${booking['total_amount']:.2f}\n"
-            result += f"📝 Reason: {reason}\n\n"
-            result += f"The booking has been successfully cancelled. "
-            
-            if booking['check_in'] > date.today():
-                result += f"The room is now available for other guests."
-            
-            return result
-            
+            check_in = _parse_date(check_in_date)
+            check_out = _parse_date(check_out_date)
         except ValueError:
-            return "Invalid booking ID format. Please provide a valid number."
-        except Exception as e:
-            return f"Error cancelling booking: {str(e)}"
+            return "Invalid date format. Please use YYYY-MM-DD format (e.g., 2024-12-25)."
+        
+        # Validate dates
+        if check_in >= check_out:
+            return "Check-out date must be after check-in date."
+        
+        today = date.today()
+        if check_in < today:
+            return "Check-in date cannot be in the past."
+        
+        room_id_int = int(room_id)
+        
+        # Check the room and the dates and insert the booking in a single statement
+        room = _SEARCH_SERVICE.reserve_if_available(
+            room_id_int, guest_name, guest_email, guest_phone, check_in, check_out
+        )
+        
+        if not room:
+            return f"Room with ID {room_id} not found or not available."
+        
+        if room['booking_id'] is None:
+            return f"❌ Room {room['room_number']} at {room['hotel_name']} is not available for {check_in_date} to {check_out_date}. Please choose different dates or another room."
+        
+        # Calculate booking details
+        booking_id = room['booking_id']
+        nights = (check_out - check_in).days
+        total_amount = room['total_amount']
+        
+        # Update room availability if booking is for current dates
+        if check_in <= today <= check_out:
+            _SEARCH_SERVICE.update_room_availability(room_id_int, False)
+        _invalidate_search_cache()
+        
+        # Generate booking confirmation
+        parts = [f"🎉 Booking Confirmed! 🎉\n\n"]
+        parts.append(f"📋 Booking ID: {booking_id}\n")
+        parts.append(f"👤 Guest: {guest_name}\n")
+        parts.append(f"📧 Email: {guest_email}\n")
+        parts.append(f"📞 Phone: {guest_phone}\n\n")
+        parts.append(f"🏨 Hotel: {room['hotel_name']}\n")
+        parts.append(f"📍 Address: {room['address']}, {room['city']}\n")
+        parts.append(f"🏠 Room: {room['room_number']} ({room['room_type']})\n")
+        parts.append(f"👥 Capacity: {room['capacity']} guests\n\n")
+        parts.append(f"📅 Check-in: {check_in_date}\n")
+        parts.append(f"📅 Check-out: {check_out_date}\n")
+        parts.append(f"🛏️ Nights: {nights}\n")
+        parts.append(f"💰 Rate: ${room['price_per_night']}/night\n")
+        parts.append(f"💵 Total Amount: ${total_amount:.2f}\n\n")
+        if room.get('hotel_email'):
+            parts.append(f"For any inquiries, contact the hotel at {room['hotel_email']}")
+            if room.get('phone_number'):
+                parts.append(f" or {room['phone_number']}")
+        parts.append(f"\n\nThank you for choosing {room['hotel_name']}! 🌟")
+        
+        return "".join(parts)
+        
+    except ValueError:
+        return "Invalid room ID format. Please provide a valid number."
+    except Exception as e:
+        return f"Error booking room: {str(e)}"
+
+
+@tool
+def get_booking_details(booking_id: str) -> str:
+    """Get details of a specific booking by booking ID."""
+    try:
+        booking_id_int = int(booking_id)
+        
+        booking = _SEARCH_SERVICE.get_booking_by_id(booking_id_int)
+        
+        if not booking:
+            return f"Booking with ID {booking_id} not found."
+        
+        # Calculate nights
+        nights = (booking['check_out'] - booking['check_in']).days
+        
+        parts = [f"📋 Booking Details (ID: {booking_id})\n\n"]
+        parts.append(f"👤 Guest: {booking['guest_name']}\n")
+        parts.append(f"📧 Email: {booking['guest_email']}\n")
+        parts.append(f"📞 Phone: {booking['guest_phone']}\n\n")
+        parts.append(f"🏨 Hotel: {booking['hotel_name']}\n")
+        parts.append(f"📍 Address: {booking['address']}, {booking['city']}\n")
+        parts.append(f"🏠 Room: {booking['room_number']} ({booking['room_type']})\n")
+        parts.append(f"👥 Capacity: {booking['capacity']} guests\n\n")
+        parts.append(f"📅 Check-in: {booking['check_in']}\n")
+        parts.append(f"📅 Check-out: {booking['check_out']}\n")
+        parts.append(f"🛏️ Nights: {nights}\n")
+        parts.append(f"💰 Rate: ${booking['price_per_night']}/night\n")
+        parts.append(f"💵 Total Amount: ${booking['total_amount']:.2f}\n")
+        parts.append(f"📊 Status: {booking['status'].upper()}\n")
+        parts.append(f"📅 Booked on: {booking['created_at'].strftime('%Y-%m-%d %H:%M')}\n\n")
+        
+        if booking.get('hotel_email'):
+            parts.append(f"For inquiries, contact: {booking['hotel_email']}")
+            if booking.get('phone_number'):
+                parts.append(f" or {booking['phone_number']}")
+        
+        return "".join(parts)
+        
+    except ValueError:
+        return "Invalid booking ID format. Please provide a valid number."
+    except Exception as e:
+        return f"Error retrieving booking details: {str(e)}"
+
 
-    @tool
-    def search_available_rooms_by_dates(city: str, check_in_date: str, check_out_date: str, room_type: str = "", max_price: str = "") -> str:
-        """Search for available rooms in a city for specific dates. Room type and max price are optional filters."""
+@tool
+def cancel_booking(booking_id: str, reason: str = "Guest requested") -> str:
+    """Cancel a booking by booking ID. Optionally provide a reason for cancellation."""
+    try:
+        booking_id_int = int(booking_id)
+        
+        # Cancel and fetch the booking details in one statement
+        booking = _SEARCH_SERVICE.cancel_if_confirmed(booking_id_int)
+        
+        if not booking:
+            return f"Booking with ID {booking_id} not found or already cancelled."
+        
+        # If booking was for current dates, make room available again
+        today = date.today()
+        if booking['check_in'] <= today <= booking['check_out']:
+            _SEARCH_SERVICE.update_room_availability(booking['room_id'], True)
+        _invalidate_search_cache()
+        
+        parts = [f"❌ Booking Cancelled\n\n"]
+        parts.append(f"📋 Booking ID: {booking_id}\n")
+        parts.append(f"👤 Guest: {booking['guest_name']}\n")
+        parts.append(f"🏨 Hotel: {booking['hotel_name']}\n")
+        parts.append(f"🏠 Room: {booking['room_number']} ({booking['room_type']})\n")
+        parts.append(f"📅 Original dates: {booking['check_in']} to {booking['check_out']}\n")
+        parts.append(f"💵 Refund amount: ${booking['total_amount']:.2f}\n")
+        parts.append(f"📝 Reason: {reason}\n\n")
+        parts.append(f"The booking has been successfully cancelled. ")
+        
+        if booking['check_in'] > today:
+            parts.append(f"The room is now available for other guests.")
+        
+        return "".join(parts)
+        
+    except ValueError:
+        return "Invalid booking ID format. Please provide a valid number."
+    except Exception as e:
+        return f"Error cancelling booking: {str(e)}"
+
+
+@tool
+def search_available_rooms_by_dates(city: str, check_in_date: str, check_out_date: str, room_type: str = "", max_price: str = "", page: int = 1) -> str:
+    """Search for available rooms in a city for specific dates. Room type and max price are optional filters. Results are paged; pass page to see more."""
+    try:
+        # Parse dates
         try:
-            tools_instance = HotelBotTools()
-            
-            # Parse dates
+            check_in = _parse_date(check_in_date)
+            check_out = _parse_date(check_out_date)
+        except ValueError:
+            return "Invalid date format. Please use YYYY-MM-DD format (e.g., 2024-12-25)."
+        
+        # Validate dates
+        if check_in >= check_out:
+            return "Check-out date must be after check-in date."
+        
+        if check_in < date.today():
+            return "Check-in date cannot be in the past."
+        
+        # Parse optional filters
+        room_type_filter = room_type if room_type else None
+        max_price_filter = None
+        if max_price:
             try:
-                check_in = datetime.strptime(check_in_date, "%Y-%m-%d").date()
-                check_out = datetime.strptime(check_out_date, "%Y-%m-%d").date()
+                max_price_filter = float(max_price)
             except ValueError:
-                return "Invalid date format. Please use YYYY-MM-DD format (e.g., 2024-12-25)."
-            
-            # Validate dates
-            if check_in >= check_out:
-                return "Check-out date must be after check-in date."
-            
-            if check_in < date.today():
-                return "Check-in date cannot be in the past."
-            
-            # Parse optional filters
-            room_type_filter = room_type if room_type else None
-            max_price_filter = None
-            if max_price:
-                try:
-                    max_price_filter = float(max_price)
-                except ValueError:
-                    pass
-            
-            # Search for available rooms using service layer
-            rooms = tools_instance.search_service.search_available_rooms_by_dates(
-                city, check_in, check_out, room_type_filter, max_price_filter
+                pass
+        
+        # Search for available rooms using service layer
+        rooms = _cached(
+            _cache_key('search_available_rooms_by_dates', city, check_in, check_out, room_type_filter, max_price_filter, page),
+            lambda: _SEARCH_SERVICE.search_available_rooms_by_dates(
+                city, check_in, check_out, room_type_filter, max_price_filter,
+                limit=_PAGE_SIZE, offset=_page_offset(page)
             )
-            
-            if not rooms:
-                return f"No available rooms found in {city} for {check_in_date} to {check_out_date}."
-            
-            # Calculate stay details
-            nights = (check_out - check_in).days
-            
-            result = f"Found {len(rooms)} available rooms in {city} for {check_in_date} to {check_out_date} ({nights} nights):\n\n"
-            
-            for room in rooms:
-                total_cost = float(room['price_per_night']) * nights
-                
-                result += f"🏨 **{room['hotel_name']}** ({room['stars']} stars)\n"
-                result += f"   📍 {room['address']}, {room['city']}\n"
-                result += f"   🏠 Room {room['room_number']} - {room['room_type']}\n"
-                result += f"   👥 Capacity: {room['capacity']} guests\n"
-                result += f"   💰 ${room['price_per_night']}/night × {nights} nights = ${total_cost:.2f}\n"
-                result += f"   🆔 Room ID: {room['id']}\n"
-                if room.get('amenities'):
-                    result += f"   🎯 Amenities: {', '.join(room['amenities'])}\n"
-                result += f"   📋 To book: use room_id {room['id']}\n\n"
-            
-            return result
-            
-        except Exception as e:
-            return f"Error searching available rooms: {str(e)}"
-
-
-class HotelBotLangGraph:
-    """LangGraph-based hotel chatbot with improved state management"""
-    
-    def __init__(self, openai_api_key: str = None):
-        self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
+        )
         
-        if not self.openai_api_key:
-            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
+        if not rooms:
+            return f"No available rooms found in {city} for {check_in_date} to {check_out_date}."
         
-        # Initialize LLM
-        self.llm = ChatOpenAI(
-            temperature=0.3,
-            model="gpt-4.1-nano-2025-04-14",
-            openai_api_key=self.openai_api_key
-        )
+        # Calculate stay details
+        nights = (check_out - check_in).days
         
-        # Initialize tools
-        self.tools = [
-            HotelBotTools.search_hotels_by_city,
-            HotelBotTools.search_hotels_by_rating,
-            HotelBotTools.get_available_rooms,
-            HotelBotTools.get_room_types_and_prices,
-            HotelBotTools.search_hotels_by_price_range,
-            HotelBotTools.get_hotel_details,
-            HotelBotTools.search_hotel_by_name,
-            HotelBotTools.check_room_availability_by_dates,
-            HotelBotTools.book_room,
-            HotelBotTools.get_booking_details,
-            HotelBotTools.cancel_booking,
-            HotelBotTools.search_available_rooms_by_dates
-        ]
-        
-        # Create the LLM with tools
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        parts = [f"Found {rooms[0]['total_count']} available rooms in {city} for {check_in_date} to {check_out_date} ({nights} nights):\n\n"]
         
-        # Initialize memory
-        self.memory = MemorySaver()
+        for room in rooms:
+            parts.append(_DATED_ROOM_HEAD(room))
+            if room.get('amenities'):
+                parts.append(_AMENITIES_LINE(', '.join(room['amenities'])))
+            parts.append(_DATED_ROOM_TAIL(room))
+        _append_page_footer(parts, rooms, page)
+        
+        return "".join(parts)
         
-        # Build the graph
-        self.app = self._build_graph()
+    except Exception as e:
+        return f"Error searching available rooms: {str(e)}"
+
+
+class BatchedHotelLookup:
+    """Coalesces hotel-by-ID lookups from concurrent tool calls into one query"""
+    
+    def __init__(self, fetch_many):
+        self.fetch_many = fetch_many  # list of IDs -> list of hotel rows, or None if the query failed
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._fetching = False
     
-    def _build_graph(self):
-        """Build the LangGraph workflow"""
+    def load(self, hotel_id: int) -> Optional[Dict]:
+        """Return the hotel row for hotel_id, or None if it does not exist"""
+        with self._lock:
+            future = self._pending.get(hotel_id)
+            if future is None:
+                future = self._pending[hotel_id] = Future()
+            # An uncontended lookup runs at once; lookups that arrive while a query is
+            # in flight wait for it and then go out together in the next one
+            leader = not self._fetching
+            self._fetching = True
         
-        # Create the graph
-        workflow = StateGraph(State)
+        while leader:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                if not batch:
+                    self._fetching = False
+                    break
+            try:
+                rows = self.fetch_many(list(batch))
+                if rows is None:
+                    raise RuntimeError("the hotel lookup query failed")
+                by_id = {row['id']: row for row in rows}
+                for batch_id, batch_future in batch.items():
+                    batch_future.set_result(by_id.get(batch_id))
+            except Exception as e:
+                for batch_future in batch.values():
+                    batch_future.set_exception(e)
         
-        # Define the chatbot node
-        def chatbot(state: State):
-            """Main chatbot logic"""
-            current_date = date.today().strftime("%Y-%m-%d")
-            system_message = f"""You are a helpful and friendly hotel booking assistant. Your name is HotelBot. 
+        return future.result()
+
+
+# The two hot lookups run as prepared statements so Postgres plans them once per connection
+# Each returns the hotel row with its available rooms aggregated as JSON (prices as text
+# so they print exactly like NUMERIC values do)
+_HOTEL_DETAILS_SQL = """
+    SELECT h.*,
+           COUNT(hr.id) as total_rooms,
+           COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms,
+           COALESCE(
+               json_agg(json_build_object(
+                   'room_number', hr.room_number,
+                   'room_type', hr.room_type,
+                   'price_per_night', hr.price_per_night::text,
+                   'capacity', hr.capacity
+               ) ORDER BY hr.price_per_night) FILTER (WHERE hr.is_available = true),
+               '[]'
+           ) AS rooms
+    FROM hotels h
+    LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
+    WHERE h.id = ANY($1) AND h.is_active = true
+    GROUP BY h.id
+"""
+# Only the first 3 rooms of each type are shown, so only those are aggregated
+_SEARCH_BY_NAME_SQL = """
+    WITH hotel AS (
+        SELECT h.* FROM hotels h WHERE h.name ILIKE $1 AND h.is_active = true ORDER BY h.id LIMIT 1
+    )
+    SELECT hotel.*,
+           (SELECT COUNT(*) FROM hotel_rooms hr WHERE hr.hotel_id = hotel.id) AS total_rooms,
+           (SELECT COUNT(*) FROM hotel_rooms hr WHERE hr.hotel_id = hotel.id AND hr.is_available = true) AS available_rooms,
+           COALESCE((
+               SELECT json_agg(json_build_object('room_type', t.room_type, 'count', t.n, 'rooms', t.rooms)
+                               ORDER BY t.min_price, t.room_type)
+               FROM (
+                   SELECT ranked.room_type,
+                          COUNT(*) AS n,
+                          MIN(ranked.price_per_night) AS min_price,
+                          json_agg(json_build_object(
+                              'room_number', ranked.room_number,
+                              'price_per_night', ranked.price_per_night::text,
+                              'capacity', ranked.capacity
+                          ) ORDER BY ranked.rn) FILTER (WHERE ranked.rn <= 3) AS rooms
+                   FROM (
+                       SELECT hr.*,
+                              ROW_NUMBER() OVER (PARTITION BY hr.room_type ORDER BY hr.price_per_night, hr.id) AS rn
+                       FROM hotel_rooms hr
+                       WHERE hr.hotel_id = hotel.id AND hr.is_available = true
+                   ) ranked
+                   GROUP BY ranked.room_type
+               ) t
+           ), '[]') AS room_types
+    FROM hotel
+"""
+_SEARCH_SERVICE.db.prepare("lg_hotel_details", _HOTEL_DETAILS_SQL)
+_SEARCH_SERVICE.db.prepare("lg_hotel_by_name", _SEARCH_BY_NAME_SQL)
 
-Today's date is {current_date}.
+_HOTEL_LOOKUP = BatchedHotelLookup(
+    lambda hotel_ids: _SEARCH_SERVICE.db.execute_prepared("lg_hotel_details", (hotel_ids,))
+)
+
+
+_SYSTEM_PROMPT = """You are a helpful and friendly hotel booking assistant. Your name is HotelBot. 
 
 You have access to a comprehensive hotel database and can help users:
 - Search for hotels in specific cities
@@ -726,302 +925,301 @@ Date Format: Always use YYYY-MM-DD format for dates (e.g., 2025-07-25, 2025-08-0
 Remember: When users ask follow-up questions about a specific hotel, use the search_hotel_by_name tool or get_hotel_details with the hotel ID to get current information.
 
 Always be helpful and provide the most relevant information based on the user's needs."""
-            
-            messages = [{"role": "system", "content": system_message}] + state["messages"]
-            response = self.llm_with_tools.invoke(messages)
-            return {"messages": [response]}
-        
-        # Define individual tool nodes - each handles multiple calls of the same tool in parallel
-        def search_hotels_by_city_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "search_hotels_by_city"]
-            results = []
-            
-            if not tool_calls:
-                return {"messages": []}
-            
-            # Execute multiple calls of the same tool in parallel using ThreadPoolExecutor
-            def execute_tool_call(tool_call):
-                try:
-                    result = HotelBotTools.search_hotels_by_city.invoke(tool_call["args"])
-                    return ToolMessage(content=result, tool_call_id=tool_call["id"])
-                except Exception as e:
-                    return ToolMessage(content=f"Error: {str(e)}", tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=min(len(tool_calls), 5)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
-        
-        def search_hotels_by_rating_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "search_hotels_by_rating"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.search_hotels_by_rating.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
-        
-        def get_available_rooms_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "get_available_rooms"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.get_available_rooms.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+_SYSTEM_MESSAGE = {"role": "system", "content": _SYSTEM_PROMPT}
+
+
+@lru_cache(maxsize=1)
+def _date_message(today: date) -> Dict:
+    """System message with the current date, built once per day"""
+    return {"role": "system", "content": f"Today's date is {today:%Y-%m-%d}."}
+
+# Threads idle past the TTL, removed from all three AsyncPostgresSaver tables at once
+_PRUNE_CHECKPOINTS_SQL = """
+    WITH stale AS (
+        SELECT thread_id FROM checkpoints
+        GROUP BY thread_id
+        HAVING MAX((checkpoint->>'ts')::timestamptz) < now() - %s
+    ), blobs AS (
+        DELETE FROM checkpoint_blobs WHERE thread_id IN (SELECT thread_id FROM stale)
+    ), writes AS (
+        DELETE FROM checkpoint_writes WHERE thread_id IN (SELECT thread_id FROM stale)
+    )
+    DELETE FROM checkpoints WHERE thread_id IN (SELECT thread_id FROM stale)
+"""
+
+
+@lru_cache(maxsize=1)
+def _build_graph(openai_api_key: str):
+    """Build the LLMs, tools and compiled graph once per process; they hold no per-session state"""
+    # Initialize LLM
+    llm = ChatOpenAI(
+        temperature=0.3,
+        model=CHATBOT_CONFIG["model"],
+        max_tokens=CHATBOT_CONFIG["max_tokens"],
+        openai_api_key=openai_api_key,
+        http_async_client=_ASYNC_HTTP_CLIENT
+    )
+    
+    # Cheaper model that folds old turns into the rolling summary
+    summary_llm = ChatOpenAI(
+        temperature=0,
+        model=CHATBOT_CONFIG["summary_model"],
+        openai_api_key=openai_api_key,
+        tags=[_SUMMARY_TAG],
+        http_async_client=_ASYNC_HTTP_CLIENT
+    )
+    
+    # Initialize tools
+    tools = [
+        search_hotels_by_city,
+        search_hotels_by_rating,
+        get_available_rooms,
+        get_room_types_and_prices,
+        search_hotels_by_price_range,
+        get_hotel_details,
+        search_hotel_by_name,
+        check_room_availability_by_dates,
+        book_room,
+        get_booking_details,
+        cancel_booking,
+        search_available_rooms_by_dates
+    ]
+    
+    # Create the LLM with tools
+    retry = dict(retry_if_exception_type=(RateLimitError,), wait_exponential_jitter=True, stop_after_attempt=4)
+    llm_with_tools = llm.bind_tools(tools).with_retry(**retry)
+    
+    # Opt-in: identical prompts (same prefix, history and date) are answered from disk instead of OpenAI.
+    # The cache is attached to this copy only, and the chatbot node skips it for turns with booking data
+    cached_llm_with_tools = None
+    if CHATBOT_CONFIG["llm_cache_enabled"]:
+        cached_llm = llm.model_copy(update={"cache": SQLiteCache(database_path=CHATBOT_CONFIG["llm_cache_path"])})
+        cached_llm_with_tools = cached_llm.bind_tools(tools).with_retry(**retry)
+    
+    # Create the graph
+    workflow = StateGraph(State)
+    
+    # Define the chatbot node
+    async def chatbot(state: State):
+        """Main chatbot logic"""
+        # The static prompt goes first so OpenAI can reuse its cached prefix across turns
+        messages = [_SYSTEM_MESSAGE, _date_message(date.today())]
+        if state.get("summary"):
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{state['summary']}"})
+        messages += _recent_history(state["messages"])
+        model = llm_with_tools
+        if cached_llm_with_tools is not None and _cacheable(state):
+            # Message ids differ on every turn; without them identical prompts share a cache key
+            model = cached_llm_with_tools
+            messages = [m.model_copy(update={"id": None}) if isinstance(m, BaseMessage) else m for m in messages]
+        async with _llm_semaphore():
+            response = await model.ainvoke(messages)
         
-        def get_room_types_and_prices_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "get_room_types_and_prices"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.get_room_types_and_prices.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+        # Stop a turn that is out of tool rounds or only repeats calls it already made;
+        # replacing the message without tool_calls lets tools_condition end the turn
+        if response.tool_calls:
+            rounds, seen = _turn_tool_calls(state["messages"])
+            # Calls this turn already made are dropped and the same call twice in one response
+            # runs once; ToolNode answers every call that is left
+            unique = {}
+            for call in response.tool_calls:
+                key = _tool_call_key(call)
+                if key not in seen:
+                    unique.setdefault(key, call)
+            if rounds >= CHATBOT_CONFIG["max_tool_rounds"] or not unique:
+                # Text the model wrote was already streamed under its id; the fallback reply gets a
+                # fresh id so stream_mode="messages" emits it instead of treating it as seen
+                if response.content:
+                    response = AIMessage(content=response.content, id=response.id)
+                else:
+                    response = AIMessage(content=_TOOL_LOOP_REPLY)
+            elif len(unique) < len(response.tool_calls):
+                response = response.model_copy(update={"tool_calls": list(unique.values())})
+        return {"messages": [response]}
+    
+    async def summarize(state: State):
+        """Fold older turns into the rolling summary and drop them from the thread"""
+        messages = state["messages"]
+        # Cut at a human turn so tool calls are never separated from their results
+        cut = _last_human_index(messages, len(messages) - _KEEP_RECENT_MESSAGES)
+        if cut <= 0:
+            return {}
         
-        def search_hotels_by_price_range_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "search_hotels_by_price_range"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.search_hotels_by_price_range.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+        if state.get("summary"):
+            instruction = f"This is the summary of the conversation so far:\n{state['summary']}\n\nExtend it with the messages above."
+        else:
+            instruction = "Summarize the conversation above."
+        instruction += " Keep every hotel ID, room ID, booking ID, date and guest detail that was mentioned."
         
-        def get_hotel_details_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "get_hotel_details"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.get_hotel_details.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
-        
-        def search_hotel_by_name_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "search_hotel_by_name"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.search_hotel_by_name.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+        async with _llm_semaphore():
+            response = await summary_llm.ainvoke(messages[:cut] + [HumanMessage(content=instruction)])
+        return {
+            "summary": response.content,
+            "messages": [RemoveMessage(id=message.id) for message in messages[:cut]]
+        }
+    
+    def route_start(state: State):
+        """Summarize first when the thread has grown long"""
+        if len(state["messages"]) > _SUMMARIZE_AFTER_MESSAGES:
+            return "summarize"
+        return "chatbot"
+    
+    # Add nodes to the graph; ToolNode runs every tool call of a turn concurrently
+    workflow.add_node("summarize", summarize)
+    workflow.add_node("chatbot", chatbot)
+    workflow.add_node("tools", ToolNode(tools))
+    
+    # Add edges
+    workflow.add_conditional_edges(START, route_start, ["summarize", "chatbot"])
+    workflow.add_edge("summarize", "chatbot")
+    workflow.add_conditional_edges("chatbot", tools_condition)
+    workflow.add_edge("tools", "chatbot")
+    
+    # Compile without a checkpointer; each bot attaches the shared one
+    return llm, summary_llm, tools, llm_with_tools, workflow.compile()
+
+
+def _graph_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting it on first use"""
+    global _GRAPH_LOOP
+    with _GRAPH_LOOP_LOCK:
+        if _GRAPH_LOOP is None:
+            _GRAPH_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_GRAPH_LOOP.run_forever, name="hotelbot-graph", daemon=True).start()
+        return _GRAPH_LOOP
+
+
+async def _open_checkpointer():
+    """Keep conversation checkpoints in Postgres, falling back to process memory.
+    Returns the checkpointer with its pool and prune task (both None for the fallback)."""
+    try:
+        conninfo = make_conninfo(
+            host=os.getenv('DB_HOST'),
+            port=os.getenv('DB_PORT'),
+            dbname=os.getenv('DB_NAME'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD') or None
+        )
+        pool = AsyncConnectionPool(
+            conninfo,
+            min_size=1,
+            max_size=DATABASE_CONFIG["pool_max_connections"],
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False
+        )
+        await pool.open(wait=True, timeout=DATABASE_CONFIG["connection_timeout"])
+        checkpointer = AsyncPostgresSaver(pool)
+        await checkpointer.setup()
+        return checkpointer, pool, asyncio.create_task(_prune_checkpoints_periodically(pool))
+    except Exception as e:
+        print(f"Error opening Postgres checkpoint store, keeping history in memory: {e}")
+        return MemorySaver(), None, None
+
+
+async def _prune_checkpoints_periodically(pool: AsyncConnectionPool):
+    """Delete conversation threads whose latest checkpoint is past the TTL"""
+    while True:
+        try:
+            async with pool.connection() as conn:
+                await conn.execute(_PRUNE_CHECKPOINTS_SQL, (timedelta(days=DATABASE_CONFIG["checkpoint_ttl_days"]),))
+        except Exception as e:
+            print(f"Error pruning old conversation checkpoints: {e}")
+        await asyncio.sleep(DATABASE_CONFIG["checkpoint_prune_interval"])
+
+
+def _checkpointer():
+    """Return the shared checkpoint store, opening it on first use"""
+    global _CHECKPOINTER, _CHECKPOINT_POOL, _PRUNE_TASK
+    with _CHECKPOINTER_LOCK:
+        if _CHECKPOINTER is None:
+            opened = asyncio.run_coroutine_threadsafe(_open_checkpointer(), _graph_loop()).result()
+            _CHECKPOINTER, _CHECKPOINT_POOL, _PRUNE_TASK = opened
+            if _CHECKPOINT_POOL is not None:
+                atexit.register(_close_checkpointer)
+        return _CHECKPOINTER
+
+
+def _close_checkpointer() -> None:
+    """Stop pruning and close the shared checkpoint pool; registered to run at process exit"""
+    global _CHECKPOINTER, _CHECKPOINT_POOL, _PRUNE_TASK
+    loop = _GRAPH_LOOP
+    if _CHECKPOINT_POOL is None or loop is None or not loop.is_running():
+        return
+    loop.call_soon_threadsafe(_PRUNE_TASK.cancel)
+    asyncio.run_coroutine_threadsafe(_CHECKPOINT_POOL.close(), loop).result()
+    _CHECKPOINTER = _CHECKPOINT_POOL = _PRUNE_TASK = None
+
+
+async def _keep_openai_connection_warm() -> None:
+    """Ping the OpenAI API while the user is typing so the next turn skips the TLS handshake"""
+    while True:
+        try:
+            # Listing models is free and needs no tokens, unlike a throwaway completion
+            await _ASYNC_HTTP_CLIENT.get(
+                f"{_OPENAI_BASE_URL}/models",
+                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+            )
+        except httpx.HTTPError:
+            # Only a warm-up; the real request will surface any connection problem
+            pass
+        await asyncio.sleep(_WARMUP_INTERVAL)
+
+
+class HotelBotLangGraph:
+    """LangGraph-based hotel chatbot with improved state management"""
+    
+    def __init__(self, openai_api_key: str = None):
+        self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
         
-        def check_room_availability_by_dates_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "check_room_availability_by_dates"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.check_room_availability_by_dates.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+        if not self.openai_api_key:
+            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable.")
         
-        def book_room_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "book_room"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.book_room.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+        # Graph topology, models and the checkpoint store are shared across instances
+        self.llm, self.summary_llm, self.tools, self.llm_with_tools, graph = _build_graph(self.openai_api_key)
         
-        def get_booking_details_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "get_booking_details"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.get_booking_details.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+        # Shared background loop that owns the checkpoint pool and runs every graph turn
+        self._loop = _graph_loop()
         
-        def cancel_booking_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "cancel_booking"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.cancel_booking.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
+        # Initialize memory
+        self.memory = _checkpointer()
         
-        def search_available_rooms_by_dates_node(state: State):
-            tool_calls = [tc for tc in state["messages"][-1].tool_calls if tc["name"] == "search_available_rooms_by_dates"]
-            results = []
-            
-            def execute_tool_call(tool_call):
-                result = HotelBotTools.search_available_rooms_by_dates.invoke(tool_call["args"])
-                return ToolMessage(content=result, tool_call_id=tool_call["id"])
-            
-            with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
-                future_to_tool = {executor.submit(execute_tool_call, tc): tc for tc in tool_calls}
-                for future in as_completed(future_to_tool):
-                    results.append(future.result())
-            
-            return {"messages": results}
-        # Route to appropriate tool nodes
-        def route_tools(state: State):
-            """Route to appropriate tool nodes based on tool calls - enables parallel execution"""
-            last_message = state["messages"][-1]
-            
-            if not hasattr(last_message, 'tool_calls') or not last_message.tool_calls:
-                return END
-            
-            # Group tool calls by tool name to enable parallel execution
-            tool_groups = {}
-            for tool_call in last_message.tool_calls:
-                tool_name = tool_call["name"]
-                if tool_name not in tool_groups:
-                    tool_groups[tool_name] = []
-                tool_groups[tool_name].append(tool_call)
-            
-            # Send each group to appropriate tool nodes for parallel execution
-            sends = []
-            for tool_name, tool_calls in tool_groups.items():
-                # Create a message with only the tool calls for this specific tool
-                try:
-                    tool_message = last_message.model_copy()
-                    tool_message.tool_calls = tool_calls
-                except Exception:
-                    # Fallback if model_copy fails
-                    tool_message = last_message
-                
-                if tool_name == "search_hotels_by_city":
-                    sends.append(Send("search_hotels_by_city_node", {"messages": [tool_message]}))
-                elif tool_name == "search_hotels_by_rating":
-                    sends.append(Send("search_hotels_by_rating_node", {"messages": [tool_message]}))
-                elif tool_name == "get_available_rooms":
-                    sends.append(Send("get_available_rooms_node", {"messages": [tool_message]}))
-                elif tool_name == "get_room_types_and_prices":
-                    sends.append(Send("get_room_types_and_prices_node", {"messages": [tool_message]}))
-                elif tool_name == "search_hotels_by_price_range":
-                    sends.append(Send("search_hotels_by_price_range_node", {"messages": [tool_message]}))
-                elif tool_name == "get_hotel_details":
-                    sends.append(Send("get_hotel_details_node", {"messages": [tool_message]}))
-                elif tool_name == "search_hotel_by_name":
-                    sends.append(Send("search_hotel_by_name_node", {"messages": [tool_message]}))
-                elif tool_name == "check_room_availability_by_dates":
-                    sends.append(Send("check_room_availability_by_dates_node", {"messages": [tool_message]}))
-                elif tool_name == "book_room":
-                    sends.append(Send("book_room_node", {"messages": [tool_message]}))
-                elif tool_name == "get_booking_details":
-                    sends.append(Send("get_booking_details_node", {"messages": [tool_message]}))
-                elif tool_name == "cancel_booking":
-                    sends.append(Send("cancel_booking_node", {"messages": [tool_message]}))
-                elif tool_name == "search_available_rooms_by_dates":
-                    sends.append(Send("search_available_rooms_by_dates_node", {"messages": [tool_message]}))
-            
-            return sends if sends else END
-        
-        # Add nodes to the graph
-        workflow.add_node("chatbot", chatbot)
-        workflow.add_node("search_hotels_by_city_node", search_hotels_by_city_node)
-        workflow.add_node("search_hotels_by_rating_node", search_hotels_by_rating_node)
-        workflow.add_node("get_available_rooms_node", get_available_rooms_node)
-        workflow.add_node("get_room_types_and_prices_node", get_room_types_and_prices_node)
-        workflow.add_node("search_hotels_by_price_range_node", search_hotels_by_price_range_node)
-        workflow.add_node("get_hotel_details_node", get_hotel_details_node)
-        workflow.add_node("search_hotel_by_name_node", search_hotel_by_name_node)
-        workflow.add_node("check_room_availability_by_dates_node", check_room_availability_by_dates_node)
-        workflow.add_node("book_room_node", book_room_node)
-        workflow.add_node("get_booking_details_node", get_booking_details_node)
-        workflow.add_node("cancel_booking_node", cancel_booking_node)
-        workflow.add_node("search_available_rooms_by_dates_node", search_available_rooms_by_dates_node)
-        
-        # Add edges
-        workflow.add_edge(START, "chatbot")
-        workflow.add_conditional_edges("chatbot", route_tools)
-        
-        # All tool nodes return to chatbot
-        workflow.add_edge("search_hotels_by_city_node", "chatbot")
-        workflow.add_edge("search_hotels_by_rating_node", "chatbot")
-        workflow.add_edge("get_available_rooms_node", "chatbot")
-        workflow.add_edge("get_room_types_and_prices_node", "chatbot")
-        workflow.add_edge("search_hotels_by_price_range_node", "chatbot")
-        workflow.add_edge("get_hotel_details_node", "chatbot")
-        workflow.add_edge("search_hotel_by_name_node", "chatbot")
-        workflow.add_edge("check_room_availability_by_dates_node", "chatbot")
-        workflow.add_edge("book_room_node", "chatbot")
-        workflow.add_edge("get_booking_details_node", "chatbot")
-        workflow.add_edge("cancel_booking_node", "chatbot")
-        workflow.add_edge("search_available_rooms_by_dates_node", "chatbot")
-        
-        # Compile the graph
-        return workflow.compile(checkpointer=self.memory)
+        # Attach the shared checkpointer to the shared compiled graph
+        self.app = graph.copy(update={"checkpointer": self.memory})
+    
+    def _run(self, coro):
+        """Run a coroutine on the background loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _on_loop(self, coro):
+        """Await a coroutine on the background loop from any event loop"""
+        # The checkpoint pool belongs to the background loop, so graph work always runs there
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
     
     def chat(self, message: str, thread_id: str = "default") -> str:
         """Main chat method"""
+        return self._run(self.achat(message, thread_id))
+    
+    @staticmethod
+    def _turn_input(message: str, thread_id: str):
+        """Build the graph input and run config for one user message"""
+        # Create the input
+        input_message = {"messages": [HumanMessage(content=message)]}
+        
+        # Configure the thread with recursion limit; callers run the turn with durability="exit"
+        # so the checkpointer writes once when the turn ends instead of after every node
+        config = {
+            "configurable": {"thread_id": thread_id},
+            "recursion_limit": CHATBOT_CONFIG["recursion_limit"]
+        }
+        return input_message, config
+    
+    async def achat(self, message: str, thread_id: str = "default") -> str:
+        """Async chat method; tool calls in one turn run concurrently"""
         try:
-            # Create the input
-            input_message = {"messages": [HumanMessage(content=message)]}
-            
-            # Configure the thread with recursion limit
-            config = {
-                "configurable": {"thread_id": thread_id},
-                "recursion_limit": 50  # Increase recursion limit
-            }
-            
             # Run the graph
-            result = self.app.invoke(input_message, config)
+            result = await self._on_loop(self.app.ainvoke(*self._turn_input(message, thread_id), durability="exit"))
             
             # Return the last message content
             return result["messages"][-1].content
@@ -1029,13 +1227,49 @@ Always be helpful and provide the most relevant information based on the user's
         except Exception as e:
             return f"I apologize, but I encountered an error: {str(e)}. Please try again or rephrase your question."
     
+    async def _astream_tokens(self, message: str, thread_id: str) -> AsyncIterator[str]:
+        """Yield text tokens of the reply as the LLM produces them"""
+        # "messages" mode forwards only LLM chunks instead of an event for every runnable
+        async for chunk, metadata in self.app.astream(*self._turn_input(message, thread_id), stream_mode="messages", durability="exit"):
+            # Summaries and tool results are not part of the reply; tool-calling steps stream
+            # empty content, so only the answer text comes through
+            if metadata["langgraph_node"] == "chatbot" and chunk.content:
+                yield chunk.content
+    
+    def stream_chat(self, message: str, thread_id: str = "default") -> Iterator[str]:
+        """Stream the response text chunk by chunk"""
+        tokens = self._astream_tokens(message, thread_id)
+        try:
+            while True:
+                try:
+                    yield self._run(tokens.__anext__())
+                except StopAsyncIteration:
+                    break
+        except Exception as e:
+            yield f"I apologize, but I encountered an error: {str(e)}. Please try again or rephrase your question."
+        finally:
+            self._run(tokens.aclose())
+    
+    async def astream_chat(self, message: str, thread_id: str = "default") -> AsyncIterator[str]:
+        """Async variant of stream_chat for callers that already run an event loop"""
+        tokens = self._astream_tokens(message, thread_id)
+        try:
+            while True:
+                try:
+                    token = await self._on_loop(tokens.__anext__())
+                except StopAsyncIteration:
+                    break
+                yield token
+        except Exception as e:
+            yield f"I apologize, but I encountered an error: {str(e)}. Please try again or rephrase your question."
+        finally:
+            await self._on_loop(tokens.aclose())
+    
     def reset_memory(self, thread_id: str = "default"):
         """Reset the conversation memory for a specific thread"""
         try:
-            # Clear the memory for this thread
-            config = {"configurable": {"thread_id": thread_id}}
-            # Since MemorySaver doesn't have a direct clear method, we'll create a new thread
-            # by simply using a new thread_id in future conversations
+            # Delete every stored checkpoint of this thread
+            self._run(self.memory.adelete_thread(thread_id))
             return f"Memory cleared for thread {thread_id}"
         except Exception as e:
             return f"Error clearing memory: {str(e)}"
@@ -1045,7 +1279,7 @@ Always be helpful and provide the most relevant information based on the user's
         try:
             config = {"configurable": {"thread_id": thread_id}}
             # Get the current state
-            current_state = self.app.get_state(config)
+            current_state = self._run(self.app.aget_state(config))
             return current_state.values.get("messages", [])
         except Exception as e:
             print(f"Error getting conversation history: {str(e)}")
@@ -1054,16 +1288,16 @@ Always be helpful and provide the most relevant information based on the user's
     def visualize_graph(self):
         """Print the graph structure (for debugging)"""
         try:
-            from langgraph.graph import Graph
+            graph = self.app.get_graph()
             print("Graph structure:")
-            print("Nodes:", list(self.app.get_graph().nodes.keys()))
-            print("Edges:", list(self.app.get_graph().edges))
+            print("Nodes:", list(graph.nodes.keys()))
+            print("Edges:", list(graph.edges))
         except Exception as e:
             print(f"Error visualizing graph: {str(e)}")
 
 
-def main():
-    """Main function to run the LangGraph chatbot"""
+async def amain():
+    """Async REPL; the prompt waits without blocking the event loop"""
     print("🏨 Welcome to HotelBot (LangGraph Edition)! 🏨")
     print("I can help you find hotels, check room availability, get pricing information, and book rooms!")
     print("Available features:")
@@ -1074,13 +1308,18 @@ def main():
     print("  • Get detailed hotel information")
     print("\nType 'quit' to exit, 'reset' to clear conversation history, or 'graph' to see the graph structure.\n")
     
+    warmup_task = None
     try:
         # Initialize chatbot
         chatbot = HotelBotLangGraph()
         thread_id = "user_session_1"  # You can use different thread IDs for different users
+        session = PromptSession()
+        
+        # The HTTP client's connections live on the shared graph loop, so the warm-up runs there too
+        warmup_task = asyncio.create_task(chatbot._on_loop(_keep_openai_connection_warm()))
         
         while True:
-            user_input = input("You: ").strip()
+            user_input = (await session.prompt_async("You: ")).strip()
             
             if user_input.lower() in ['quit', 'exit', 'bye']:
                 print("🤖 HotelBot: Thank you for using HotelBot! Have a great day! 🌟")
@@ -1099,15 +1338,27 @@ def main():
             if not user_input:
                 continue
             
-            # Get response from chatbot
-            response = chatbot.chat(user_input, thread_id)
-            print(f"🤖 HotelBot: {response}\n")
+            # Print the response as it streams in
+            print("🤖 HotelBot: ", end="", flush=True)
+            async for chunk in chatbot.astream_chat(user_input, thread_id):
+                print(chunk, end="", flush=True)
+            print("\n")
             
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
         print("\n🤖 HotelBot: Goodbye! 👋")
     except Exception as e:
         print(f"Error initializing chatbot: {str(e)}")
         print("Please make sure your OpenAI API key is set in the .env file.")
+    finally:
+        # Stop the warm-up on every exit path and wait for it so no task is left pending
+        if warmup_task is not None:
+            warmup_task.cancel()
+            await asyncio.gather(warmup_task, return_exceptions=True)
+
+
+def main():
+    """Main function to run the LangGraph chatbot"""
+    asyncio.run(amain())
 
 
 if __name__ == "__main__":
@@ -2,25 +2,44 @@
 Configuration file for HotelBot
 """
 
+import os
+
+# Project directory, so data files do not depend on where the bot is started from
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Chatbot Configuration
 CHATBOT_CONFIG = {
     "temperature": 0.7,
-    "model": "gpt-3.5-turbo",
+    "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+    "summary_model": os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4o-mini"),  # Folds older turns into the summary
     "memory_window": 10,  # Number of previous exchanges to remember
     "max_tokens": 1000,
-    "verbose": True  # Set to False for production
+    "verbose": True,  # Set to False for production
+    "llm_cache_enabled": os.getenv("HOTELBOT_LLM_CACHE", "false").lower() == "true",  # Opt-in; only turns without tool or guest context are cached
+    "llm_cache_path": os.path.join(_BASE_DIR, ".hotelbot_llm_cache.db"),  # SQLite cache of LLM responses for repeated prompts
+    "max_tool_rounds": 5,  # Tool-calling steps allowed per user message before the bot must answer
+    "recursion_limit": 25  # Hard cap on graph steps per user message
 }
 
 # Database Configuration
 DATABASE_CONFIG = {
     "connection_timeout": 30,
     "query_timeout": 60,
-    "retry_attempts": 3
+    "retry_attempts": 3,
+    "pool_min_connections": 2,
+    "pool_max_connections": (os.cpu_count() or 4) * 2 + 1,  # cores * 2 + 1
+    "pool_max_idle_seconds": 300,  # Reconnect pooled connections idle longer than this
+    "pool_leak_detection_threshold": 60,  # Warn when a connection is held longer than this
+    "plan_cache_mode": "force_custom_plan",  # Re-plan prepared statements per call (PostgreSQL 12+); None keeps the server default
+    "checkpoint_ttl_days": 7,  # Drop LangGraph conversation threads idle longer than this
+    "checkpoint_prune_interval": 3600,  # Seconds between checkpoint cleanups
+    "summary_refresh_delay": 5  # Seconds to gather inventory writes before refreshing the summary views
 }
 
 # Tool Configuration
 TOOL_CONFIG = {
     "max_results_per_search": 10,
+    "max_rows_per_query": 50,
     "default_room_filters": {
         "available_only": True,
         "sort_by": "price_asc"
@@ -1,69 +1,190 @@
 import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extensions import connection as _PgConnection
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+from config import DATABASE_CONFIG
+
 # Load environment variables with override
 load_dotenv(override=True)
 
-class DatabaseConnection:
-    def __init__(self):
-        self.connection = None
-        self.cursor = None
+class PreparingConnection(_PgConnection):
+    """Connection that remembers which statements have been PREPAREd on it"""
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = time.monotonic()
+        # After five runs Postgres may switch a prepared statement to a generic plan, which
+        # ignores the actual LIKE pattern or price range and can fall back to a seq scan.
+        # Forcing custom plans keeps the parse savings and re-plans with the real values.
+        plan_cache_mode = DATABASE_CONFIG["plan_cache_mode"]
+        if plan_cache_mode and self.server_version >= 120000:
+            with self.cursor() as cursor:
+                cursor.execute("SET plan_cache_mode = %s", (plan_cache_mode,))
+            self.commit()
+
+# Statements registered with DatabaseConnection.prepare(), by name
+_prepared_sql = {}
+_prepared_lock = threading.Lock()
+
+# Process-wide connection pool shared by every DatabaseConnection
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises when empty, so callers queue here for a free connection
+_pool_slots = threading.BoundedSemaphore(DATABASE_CONFIG["pool_max_connections"])
+# Borrowed connections and when they were taken, checked by the leak watchdog
+_borrowed = {}
+
+def _watch_for_leaks():
+    """Report connections held past the leak detection threshold"""
+    threshold = DATABASE_CONFIG["pool_leak_detection_threshold"]
+    reported = set()
+    while True:
+        time.sleep(threshold / 4)
+        now = time.monotonic()
+        overdue = {(key, since): thread_name for key, (since, thread_name) in list(_borrowed.items()) if now - since > threshold}
+        for (key, since), thread_name in overdue.items():
+            if (key, since) not in reported:
+                print(f"Warning: connection borrowed by {thread_name} not returned after {now - since:.0f}s")
+        # Report each borrow once
+        reported = set(overdue)
+
+def get_pool():
+    """Return the shared connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Debug: Print connection parameters
+                print("Attempting connection with:")
+                print(f"  Host: {os.getenv('DB_HOST')}")
+                print(f"  Port: {os.getenv('DB_PORT')}")
+                print(f"  Database: {os.getenv('DB_NAME')}")
+                print(f"  User: {os.getenv('DB_USER')}")
+                print(f"  Password: {'Set' if os.getenv('DB_PASSWORD') else 'Empty'}")
+                
+                _pool = ThreadedConnectionPool(
+                    minconn=DATABASE_CONFIG["pool_min_connections"],
+                    maxconn=DATABASE_CONFIG["pool_max_connections"],
+                    host=os.getenv('DB_HOST'),
+                    port=os.getenv('DB_PORT'),
+                    database=os.getenv('DB_NAME'),
+                    user=os.getenv('DB_USER'),
+                    password=os.getenv('DB_PASSWORD') or None,
+                    connection_factory=PreparingConnection
+                )
+                atexit.register(close_pool)
+                threading.Thread(target=_watch_for_leaks, name="db-leak-watchdog", daemon=True).start()
+                print("Database connection pool established successfully!")
+    return _pool
+
+def close_pool():
+    """Close every connection in the shared pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+class DatabaseConnection:
     def connect(self):
-        """Establish connection to PostgreSQL database"""
+        """Make sure the shared connection pool is available"""
         try:
-            # Debug: Print connection parameters
-            print("Attempting connection with:")
-            print(f"  Host: {os.getenv('DB_HOST')}")
-            print(f"  Port: {os.getenv('DB_PORT')}")
-            print(f"  Database: {os.getenv('DB_NAME')}")
-            print(f"  User: {os.getenv('DB_USER')}")
-            print(f"  Password: {'Set' if os.getenv('DB_PASSWORD') else 'Empty'}")
-            
-            self.connection = psycopg2.connect(
-                host=os.getenv('DB_HOST'),
-                port=os.getenv('DB_PORT'),
-                database=os.getenv('DB_NAME'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD') or None
-            )
-            self.cursor = self.connection.cursor(cursor_factory=RealDictCursor)
-            print("Database connection established successfully!")
+            get_pool()
             return True
         except Exception as e:
             print(f"Error connecting to database: {e}")
             return False
     
     def disconnect(self):
-        """Close database connection"""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-        print("Database connection closed.")
+        """Release this handle; pooled connections stay open until process exit"""
+        pass
+    
+    @contextmanager
+    def borrow(self):
+        """Borrow a pooled connection for one unit of work and yield a dict cursor"""
+        pool = get_pool()
+        with _pool_slots:
+            connection = pool.getconn()
+            # Idle too long; the server or a proxy may have dropped it. The pool hands out its
+            # other idle connections next, so keep going until a recent or new one comes back
+            while time.monotonic() - connection.last_used > DATABASE_CONFIG["pool_max_idle_seconds"]:
+                pool.putconn(connection, close=True)
+                connection = pool.getconn()
+            _borrowed[id(connection)] = (time.monotonic(), threading.current_thread().name)
+            try:
+                with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+                    yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                _borrowed.pop(id(connection), None)
+                connection.last_used = time.monotonic()
+                pool.putconn(connection)
     
     def execute_query(self, query, params=None):
         """Execute a SELECT query"""
         try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
+            with self.borrow() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
         except Exception as e:
             print(f"Error executing query: {e}")
             return None
     
+    def prepare(self, name, query):
+        """Register a SELECT to run as a server-side prepared statement.
+        The query uses $1, $2, ... placeholders and is PREPAREd lazily, once per pooled connection."""
+        with _prepared_lock:
+            existing = _prepared_sql.get(name)
+            if existing is not None and existing != query:
+                raise ValueError(f"Prepared statement '{name}' is already registered with different SQL")
+            _prepared_sql[name] = query
+    
+    def execute_prepared(self, name, params=None):
+        """Execute a statement registered with prepare() so Postgres reuses its plan"""
+        try:
+            with self.borrow() as cursor:
+                connection = cursor.connection
+                if name not in connection.prepared:
+                    cursor.execute(f"PREPARE {name} AS {_prepared_sql[name]}")
+                    connection.prepared.add(name)
+                if params:
+                    placeholders = ", ".join(["%s"] * len(params))
+                    cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+                else:
+                    cursor.execute(f"EXECUTE {name}")
+                return cursor.fetchall()
+        except Exception as e:
+            print(f"Error executing prepared query: {e}")
+            return None
+    
     def execute_update(self, query, params=None):
         """Execute an INSERT, UPDATE, or DELETE query"""
         try:
-            self.cursor.execute(query, params)
-            self.connection.commit()
-            return self.cursor.rowcount
+            with self.borrow() as cursor:
+                cursor.execute(query, params)
+                return cursor.rowcount
         except Exception as e:
             print(f"Error executing update: {e}")
-            self.connection.rollback()
             return 0
     
+    def refresh_summary_views(self):
+        """Recompute the inventory summary views without blocking readers"""
+        return self.execute_update(
+            "REFRESH MATERIALIZED VIEW CONCURRENTLY mv_city_summary; "
+            "REFRESH MATERIALIZED VIEW CONCURRENTLY mv_room_types_and_prices;"
+        )
+    
     def create_tables(self):
         """Create database tables if they don't exist"""
         try:
@@ -137,18 +258,85 @@ class DatabaseConnection:
             );
             """
             
+            # Trigram support for substring searches on hotel names
+            create_extensions = """
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            """
+            
+            # GiST support for the room_id part of the stay constraint; some servers do not ship it
+            create_btree_gist = """
+            CREATE EXTENSION IF NOT EXISTS btree_gist;
+            """
+            
+            # Stay ranges compared by the booking overlap checks
+            create_booking_stays = """
+            ALTER TABLE bookings ADD COLUMN IF NOT EXISTS stay daterange
+                GENERATED ALWAYS AS (daterange(check_in, check_out, '[)')) STORED;
+            """
+            
+            # Rejects overlapping confirmed bookings of a room; its GiST index serves the overlap checks
+            create_stay_constraint = """
+            DO $$ BEGIN
+                ALTER TABLE bookings ADD CONSTRAINT no_overlapping_stays
+                    EXCLUDE USING gist (room_id WITH =, stay WITH &&) WHERE (status = 'confirmed');
+            EXCEPTION
+                WHEN duplicate_table OR duplicate_object THEN null;
+            END $$;
+            """
+            
             # Create indexes
             create_indexes = """
+            CREATE INDEX IF NOT EXISTS idx_hotels_name_trgm ON hotels USING gin (name gin_trgm_ops);
             CREATE INDEX IF NOT EXISTS idx_hotels_city ON hotels(city);
+            DROP INDEX IF EXISTS idx_hotels_city_lower_trgm;
+            CREATE INDEX IF NOT EXISTS idx_hotels_city_trgm ON hotels USING gin (city gin_trgm_ops);
             CREATE INDEX IF NOT EXISTS idx_hotels_stars ON hotels(stars);
-            CREATE INDEX IF NOT EXISTS idx_hotels_active ON hotels(is_active);
-            CREATE INDEX IF NOT EXISTS idx_hotel_rooms_hotel_id ON hotel_rooms(hotel_id);
-            CREATE INDEX IF NOT EXISTS idx_hotel_rooms_available ON hotel_rooms(is_available);
+            DROP INDEX IF EXISTS idx_hotels_active;
+            DROP INDEX IF EXISTS idx_hotels_active_city;
+            DROP INDEX IF EXISTS idx_hotel_rooms_hotel_id;
+            CREATE INDEX IF NOT EXISTS idx_hotel_rooms_hotel_covering ON hotel_rooms(hotel_id) INCLUDE (is_available, price_per_night, room_type, room_number);
+            DROP INDEX IF EXISTS idx_hotel_rooms_available;
+            CREATE INDEX IF NOT EXISTS idx_rooms_avail_price ON hotel_rooms(hotel_id, price_per_night) INCLUDE (room_type, room_number) WHERE is_available = true;
             CREATE INDEX IF NOT EXISTS idx_hotel_rooms_price ON hotel_rooms(price_per_night);
             CREATE INDEX IF NOT EXISTS idx_hotel_rooms_type ON hotel_rooms(room_type);
             CREATE INDEX IF NOT EXISTS idx_bookings_room_id ON bookings(room_id);
             CREATE INDEX IF NOT EXISTS idx_bookings_dates ON bookings(check_in, check_out);
             CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status);
+            DROP INDEX IF EXISTS idx_bookings_room_confirmed;
+            """
+            
+            # Pre-aggregated inventory summaries; refresh_summary_views() brings them up to date
+            create_summary_views = """
+            CREATE MATERIALIZED VIEW IF NOT EXISTS mv_city_summary AS
+            SELECT 
+                h.city,
+                COUNT(DISTINCT h.id) as hotel_count,
+                COUNT(hr.id) as total_rooms,
+                COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms,
+                AVG(h.stars) as avg_rating,
+                MIN(hr.price_per_night) as min_price,
+                MAX(hr.price_per_night) as max_price
+            FROM hotels h
+            LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
+            WHERE h.is_active = true
+            GROUP BY h.city;
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_city_summary_city ON mv_city_summary(city);
+
+            CREATE MATERIALIZED VIEW IF NOT EXISTS mv_room_types_and_prices AS
+            SELECT 
+                hr.hotel_id,
+                hr.room_type,
+                COUNT(*) as available_count,
+                MIN(hr.price_per_night) as min_price,
+                MAX(hr.price_per_night) as max_price,
+                AVG(hr.price_per_night) as avg_price,
+                h.name as hotel_name,
+                h.city
+            FROM hotel_rooms hr
+            JOIN hotels h ON hr.hotel_id = h.id
+            WHERE hr.is_available = true AND h.is_active = true
+            GROUP BY hr.hotel_id, hr.room_type, h.name, h.city;
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_room_types_hotel_type ON mv_room_types_and_prices(hotel_id, room_type);
             """
             
             # Create trigger function
@@ -177,16 +365,38 @@ class DatabaseConnection:
                 FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
             """
             
-            # Execute table creation queries
-            self.execute_update(create_room_type_enum)
-            self.execute_update(create_hotels_table)
-            self.execute_update(create_rooms_table)
-            self.execute_update(create_bookings_table)
-            self.execute_update(create_indexes)
-            self.execute_update(create_trigger_function)
-            self.execute_update(create_triggers)
+            # Send the whole schema in one round trip; borrow() commits once, or rolls it all back
+            ddl = "\n".join([
+                create_room_type_enum,
+                create_hotels_table,
+                create_rooms_table,
+                create_bookings_table,
+                create_extensions,
+                create_booking_stays,
+                create_indexes,
+                create_summary_views,
+                create_trigger_function,
+                create_triggers
+            ])
+            with self.borrow() as cursor:
+                cursor.execute(ddl)
             
             print("Tables created successfully!")
             
+            # Own transactions, so a missing btree_gist or bookings that already overlap cannot
+            # roll back the schema above; the booking queries check overlaps without the constraint
+            try:
+                with self.borrow() as cursor:
+                    cursor.execute(create_btree_gist)
+            except psycopg2.Error as e:
+                print(f"Skipping no_overlapping_stays, the btree_gist extension is not available: {e}")
+            else:
+                try:
+                    with self.borrow() as cursor:
+                        cursor.execute(create_stay_constraint)
+                except psycopg2.errors.ExclusionViolation as e:
+                    print(f"Error adding no_overlapping_stays, some confirmed bookings of a room overlap. "
+                          f"Cancel the duplicates and run create_tables again: {e}")
+            
         except Exception as e:
             print(f"Error creating tables: {e}")
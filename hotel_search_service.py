@@ -1,313 +1,404 @@
+import atexit
+import threading
 from database import DatabaseConnection
+from config import DATABASE_CONFIG, TOOL_CONFIG
 from typing import List, Dict, Optional
 from datetime import datetime, date
 
+# Upper bound on rows returned by list searches; replies only show the first few anyway
+DEFAULT_RESULT_LIMIT = TOOL_CONFIG["max_rows_per_query"]
+
+# Fixed-shape queries run as prepared statements so Postgres parses and plans them once per
+# connection; optional filters are passed as NULL and skipped by an "IS NULL OR" guard
+_PREPARED_QUERIES = {
+    "svc_hotels_by_city": """
+    SELECT h.*, r.total_rooms, r.available_rooms,
+           COUNT(*) OVER() as total_count
+    FROM hotels h
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) as total_rooms,
+               COUNT(*) FILTER (WHERE hr.is_available = true) as available_rooms
+        FROM hotel_rooms hr
+        WHERE hr.hotel_id = h.id
+    ) r ON true
+    WHERE h.city ILIKE $1 AND h.is_active = true
+    ORDER BY h.stars DESC, h.name
+    LIMIT $2 OFFSET $3
+    """,
+    "svc_hotels_by_rating": """
+    SELECT h.*, r.total_rooms, r.available_rooms,
+           COUNT(*) OVER() as total_count
+    FROM hotels h
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) as total_rooms,
+               COUNT(*) FILTER (WHERE hr.is_available = true) as available_rooms
+        FROM hotel_rooms hr
+        WHERE hr.hotel_id = h.id
+    ) r ON true
+    WHERE h.stars >= $1::numeric AND h.is_active = true
+    ORDER BY h.stars DESC, h.name
+    LIMIT $2 OFFSET $3
+    """,
+    "svc_available_rooms": """
+    SELECT hr.*, h.name as hotel_name, h.city, h.address
+    FROM hotel_rooms hr
+    JOIN hotels h ON hr.hotel_id = h.id
+    WHERE hr.is_available = true AND h.is_active = true
+    AND ($1::integer IS NULL OR hr.hotel_id = $1)
+    AND ($2::text IS NULL OR hr.room_type::text ILIKE $2)
+    AND ($3::numeric IS NULL OR hr.price_per_night <= $3)
+    ORDER BY hr.price_per_night ASC
+    LIMIT $4
+    """,
+    "svc_room_types_and_prices": """
+    SELECT room_type, available_count, min_price, max_price, avg_price, hotel_name, city
+    FROM mv_room_types_and_prices
+    WHERE ($1::integer IS NULL OR hotel_id = $1)
+    ORDER BY avg_price ASC
+    LIMIT $2
+    """,
+    "svc_hotels_by_price_range": """
+    SELECT h.*, r.min_room_price, r.max_room_price, r.total_rooms,
+           COUNT(*) OVER() as total_count
+    FROM hotels h
+    JOIN LATERAL (
+        SELECT MIN(hr.price_per_night) as min_room_price,
+               MAX(hr.price_per_night) as max_room_price,
+               COUNT(*) as total_rooms
+        FROM hotel_rooms hr
+        WHERE hr.hotel_id = h.id
+        AND hr.price_per_night BETWEEN $1 AND $2
+        AND hr.is_available = true
+    ) r ON r.total_rooms > 0
+    WHERE h.is_active = true
+    ORDER BY h.stars DESC, h.name
+    LIMIT $3 OFFSET $4
+    """,
+    "svc_hotel_details": """
+    SELECT h.*, r.total_rooms, r.available_rooms, r.min_price, r.max_price,
+           (SELECT COUNT(*) FROM bookings b JOIN hotel_rooms hr ON hr.id = b.room_id WHERE hr.hotel_id = h.id) as total_bookings
+    FROM hotels h
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) as total_rooms,
+               COUNT(*) FILTER (WHERE hr.is_available = true) as available_rooms,
+               MIN(hr.price_per_night) as min_price,
+               MAX(hr.price_per_night) as max_price
+        FROM hotel_rooms hr
+        WHERE hr.hotel_id = h.id
+    ) r ON true
+    WHERE h.name ILIKE $1 AND h.is_active = true
+    """,
+    "svc_city_summary": """
+    SELECT * FROM mv_city_summary WHERE city ILIKE $1
+    """,
+    "svc_recent_bookings": """
+    SELECT 
+        b.guest_name,
+        h.name as hotel_name,
+        h.city,
+        hr.room_number,
+        hr.room_type,
+        b.check_in,
+        b.check_out,
+        b.total_amount,
+        b.status
+    FROM bookings b
+    JOIN hotel_rooms hr ON b.room_id = hr.id
+    JOIN hotels h ON hr.hotel_id = h.id
+    WHERE h.is_active = true
+    ORDER BY b.created_at DESC
+    LIMIT $1
+    """,
+    "svc_room_availability": """
+    SELECT hr.*, h.name as hotel_name, h.city
+    FROM hotel_rooms hr
+    JOIN hotels h ON hr.hotel_id = h.id
+    WHERE h.name ILIKE $1
+    AND hr.is_available = true AND h.is_active = true
+    AND ($2::text IS NULL OR hr.room_type::text ILIKE $2)
+    ORDER BY hr.price_per_night ASC
+    LIMIT $3
+    """,
+    "svc_hotel_by_name": """
+    SELECT h.*, r.total_rooms, r.available_rooms
+    FROM hotels h
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) as total_rooms,
+               COUNT(*) FILTER (WHERE hr.is_available = true) as available_rooms
+        FROM hotel_rooms hr
+        WHERE hr.hotel_id = h.id
+    ) r ON true
+    WHERE h.name ILIKE $1 AND h.is_active = true
+    """,
+    "svc_available_rooms_by_dates": """
+    SELECT hr.*, h.name as hotel_name, h.city, h.address, h.stars, h.amenities,
+           $3::date - $2::date as nights,
+           hr.price_per_night * ($3::date - $2::date) as total_cost,
+           COUNT(*) OVER() as total_count
+    FROM hotel_rooms hr
+    JOIN hotels h ON hr.hotel_id = h.id
+    WHERE h.is_active = true 
+    AND hr.is_available = true
+    AND h.city ILIKE $1
+    AND NOT EXISTS (
+        SELECT 1 FROM bookings b
+        WHERE b.room_id = hr.id AND b.status = 'confirmed'
+        AND b.stay && daterange($2, $3, '[)')
+    )
+    AND ($4::text IS NULL OR hr.room_type::text ILIKE $4)
+    AND ($5::numeric IS NULL OR hr.price_per_night <= $5)
+    ORDER BY h.stars DESC, hr.price_per_night ASC
+    LIMIT $6 OFFSET $7
+    """,
+    "svc_hotel_by_id": """
+    SELECT h.*, r.total_rooms, r.available_rooms
+    FROM hotels h
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) as total_rooms,
+               COUNT(*) FILTER (WHERE hr.is_available = true) as available_rooms
+        FROM hotel_rooms hr
+        WHERE hr.hotel_id = h.id
+    ) r ON true
+    WHERE h.id = $1 AND h.is_active = true
+    """,
+    "svc_room_by_id": """
+    SELECT hr.*, h.name as hotel_name, h.city, h.address, h.phone_number, h.email as hotel_email
+    FROM hotel_rooms hr
+    JOIN hotels h ON hr.hotel_id = h.id
+    WHERE hr.id = $1 AND hr.is_available = true AND h.is_active = true
+    """,
+    "svc_booking_conflict": """
+    SELECT EXISTS (
+        SELECT 1 FROM bookings
+        WHERE room_id = $1
+        AND status = 'confirmed'
+        AND stay && daterange($2, $3, '[)')
+    ) as has_conflict
+    """,
+    "svc_booking_by_id": """
+    SELECT b.*, 
+           hr.room_number, hr.room_type, hr.capacity, hr.price_per_night,
+           h.name as hotel_name, h.city, h.address, h.phone_number, h.email as hotel_email
+    FROM bookings b
+    JOIN hotel_rooms hr ON b.room_id = hr.id
+    JOIN hotels h ON hr.hotel_id = h.id
+    WHERE b.id = $1
+    """,
+    "svc_confirmed_booking_by_id": """
+    SELECT b.*, 
+           hr.room_number, hr.room_type,
+           h.name as hotel_name
+    FROM bookings b
+    JOIN hotel_rooms hr ON b.room_id = hr.id
+    JOIN hotels h ON hr.hotel_id = h.id
+    WHERE b.id = $1 AND b.status = 'confirmed'
+    """
+}
+
 class HotelSearchService:
     def __init__(self):
         self.db = DatabaseConnection()
+        for name, query in _PREPARED_QUERIES.items():
+            self.db.prepare(name, query)
+        self._refresh_timer = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_listeners = []
     
     def connect(self):
         """Connect to the database"""
-        return self.db.connect()
+        connected = self.db.connect()
+        if connected:
+            # Registered after the pool's own exit hook so it runs while the pool is still open
+            atexit.register(self.flush_summary_refresh)
+        return connected
+    
+    def add_refresh_listener(self, callback):
+        """Call callback() after every summary refresh, e.g. to drop results cached from the old views"""
+        self._refresh_listeners.append(callback)
+    
+    def refresh_summaries(self):
+        """Bring the city and room-type summary views up to date"""
+        refreshed = self.db.refresh_summary_views()
+        for callback in self._refresh_listeners:
+            callback()
+        return refreshed
+    
+    def schedule_summary_refresh(self):
+        """Refresh the summary views shortly on a timer thread; writes within the delay share one refresh"""
+        with self._refresh_lock:
+            if self._refresh_timer is None:
+                self._refresh_timer = threading.Timer(DATABASE_CONFIG["summary_refresh_delay"], self._run_summary_refresh)
+                self._refresh_timer.daemon = True
+                self._refresh_timer.start()
+    
+    def _run_summary_refresh(self):
+        """Timer callback; writes made during the refresh schedule the next one"""
+        with self._refresh_lock:
+            self._refresh_timer = None
+        self.refresh_summaries()
+    
+    def flush_summary_refresh(self):
+        """Run a pending summary refresh now instead of waiting for its timer"""
+        with self._refresh_lock:
+            timer, self._refresh_timer = self._refresh_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.refresh_summaries()
     
     def disconnect(self):
         """Disconnect from the database"""
         self.db.disconnect()
     
-    def search_hotels_by_city(self, city: str) -> List[Dict]:
+    def search_hotels_by_city(self, city: str, limit: int = DEFAULT_RESULT_LIMIT, offset: int = 0) -> List[Dict]:
         """Search hotels in a specific city"""
-        query = """
-        SELECT h.*, 
-               COUNT(hr.id) as total_rooms,
-               COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms
-        FROM hotels h
-        LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
-        WHERE LOWER(h.city) LIKE LOWER(%s) AND h.is_active = true
-        GROUP BY h.id, h.name, h.address, h.city, h.stars, h.description, h.phone_number, h.email, h.latitude, h.longitude, h.amenities, h.is_active, h.created_at, h.updated_at
-        ORDER BY h.stars DESC, h.name;
-        """
-        return self.db.execute_query(query, (f"%{city}%",))
+        return self.db.execute_prepared("svc_hotels_by_city", (f"%{city}%", limit, offset))
     
-    def search_hotels_by_rating(self, min_rating: float) -> List[Dict]:
+    def search_hotels_by_rating(self, min_rating: float, limit: int = DEFAULT_RESULT_LIMIT, offset: int = 0) -> List[Dict]:
         """Search hotels with minimum rating (now using stars)"""
-        query = """
-        SELECT h.*, 
-               COUNT(hr.id) as total_rooms,
-               COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms
-        FROM hotels h
-        LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
-        WHERE h.stars >= %s AND h.is_active = true
-        GROUP BY h.id, h.name, h.address, h.city, h.stars, h.description, h.phone_number, h.email, h.latitude, h.longitude, h.amenities, h.is_active, h.created_at, h.updated_at
-        ORDER BY h.stars DESC, h.name;
-        """
-        return self.db.execute_query(query, (min_rating,))
+        return self.db.execute_prepared("svc_hotels_by_rating", (min_rating, limit, offset))
     
-    def get_available_rooms(self, hotel_id: int = None, room_type: str = None, max_price: float = None) -> List[Dict]:
-        """Get available rooms with optional filters"""
-        query = """
-        SELECT hr.*, h.name as hotel_name, h.city, h.address
-        FROM hotel_rooms hr
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE hr.is_available = true AND h.is_active = true
-        """
+    def search_hotels(self, city: str = None, min_rating: float = None, min_price: float = None,
+                      max_price: float = None, hotel_id: int = None, hotel_name: str = None,
+                      include_rooms: bool = False, limit: int = DEFAULT_RESULT_LIMIT) -> List[Dict]:
+        """Search hotels with any combination of filters in a single query"""
         params = []
+        rooms_column = ""
+        room_aggregates = ""
+        if include_rooms:
+            rooms_column = ", r.rooms"
+            # Prices go into the JSON as text so they print exactly like NUMERIC values do
+            room_aggregates += """,
+                   COALESCE(json_agg(json_build_object(
+                       'id', hr.id, 'room_number', hr.room_number, 'room_type', hr.room_type,
+                       'price_per_night', hr.price_per_night::text
+                   ) ORDER BY hr.price_per_night) FILTER (WHERE hr.is_available = true), '[]') as rooms"""
         
-        if hotel_id:
-            query += " AND hr.hotel_id = %s"
-            params.append(hotel_id)
+        # Price filters keep hotels with at least one available room in range
+        price_conditions = []
+        if min_price is not None:
+            price_conditions.append("hr.price_per_night >= %s")
+            params.append(min_price)
         
-        if room_type:
-            query += " AND LOWER(hr.room_type::text) LIKE LOWER(%s)"
-            params.append(f"%{room_type}%")
-        
-        if max_price:
-            query += " AND hr.price_per_night <= %s"
+        if max_price is not None:
+            price_conditions.append("hr.price_per_night <= %s")
             params.append(max_price)
         
-        query += " ORDER BY hr.price_per_night ASC;"
+        if price_conditions:
+            room_aggregates += f""",
+                   COUNT(*) FILTER (WHERE hr.is_available = true AND {' AND '.join(price_conditions)}) as rooms_in_price_range"""
         
-        return self.db.execute_query(query, params if params else None)
-    
-    def get_room_types_and_prices(self, hotel_id: int = None) -> List[Dict]:
-        """Get room types and their price ranges"""
-        query = """
-        SELECT 
-            hr.room_type,
-            COUNT(*) as available_count,
-            MIN(hr.price_per_night) as min_price,
-            MAX(hr.price_per_night) as max_price,
-            AVG(hr.price_per_night) as avg_price,
-            h.name as hotel_name,
-            h.city
-        FROM hotel_rooms hr
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE hr.is_available = true AND h.is_active = true
+        # Room aggregates come from a per-hotel lateral subquery, so the outer query needs no GROUP BY
+        query = f"""
+        SELECT h.*, r.total_rooms, r.available_rooms, r.min_room_price, r.max_room_price{rooms_column},
+               COUNT(*) OVER() as total_count
+        FROM hotels h
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) as total_rooms,
+                   COUNT(*) FILTER (WHERE hr.is_available = true) as available_rooms,
+                   MIN(hr.price_per_night) FILTER (WHERE hr.is_available = true) as min_room_price,
+                   MAX(hr.price_per_night) FILTER (WHERE hr.is_available = true) as max_room_price{room_aggregates}
+            FROM hotel_rooms hr
+            WHERE hr.hotel_id = h.id
+        ) r ON true
+        WHERE h.is_active = true
         """
-        params = []
+        
+        if price_conditions:
+            query += " AND r.rooms_in_price_range > 0"
+        
+        if city:
+            query += " AND h.city ILIKE %s"
+            params.append(f"%{city}%")
+        
+        if min_rating:
+            query += " AND h.stars >= %s"
+            params.append(min_rating)
         
         if hotel_id:
-            query += " AND hr.hotel_id = %s"
+            query += " AND h.id = %s"
             params.append(hotel_id)
         
-        query += """
-        GROUP BY hr.room_type, h.name, h.city
-        ORDER BY avg_price ASC;
-        """
+        if hotel_name:
+            query += " AND h.name ILIKE %s"
+            params.append(f"%{hotel_name}%")
+        
+        query += " ORDER BY h.stars DESC, h.name LIMIT %s;"
+        params.append(limit)
         
-        return self.db.execute_query(query, params if params else None)
+        return self.db.execute_query(query, params)
     
-    def search_hotels_by_price_range(self, min_price: float, max_price: float) -> List[Dict]:
+    def get_available_rooms(self, hotel_id: int = None, room_type: str = None, max_price: float = None,
+                            limit: int = DEFAULT_RESULT_LIMIT) -> List[Dict]:
+        """Get available rooms with optional filters"""
+        room_type_pattern = f"%{room_type}%" if room_type else None
+        return self.db.execute_prepared("svc_available_rooms", (hotel_id or None, room_type_pattern, max_price or None, limit))
+    
+    def get_room_types_and_prices(self, hotel_id: int = None, limit: int = DEFAULT_RESULT_LIMIT) -> List[Dict]:
+        """Get room types and their price ranges"""
+        return self.db.execute_prepared("svc_room_types_and_prices", (hotel_id or None, limit))
+    
+    def search_hotels_by_price_range(self, min_price: float, max_price: float, limit: int = DEFAULT_RESULT_LIMIT,
+                                     offset: int = 0) -> List[Dict]:
         """Search hotels with rooms in a specific price range"""
-        query = """
-        SELECT DISTINCT h.*, 
-               MIN(hr.price_per_night) as min_room_price,
-               MAX(hr.price_per_night) as max_room_price,
-               COUNT(hr.id) as total_rooms
-        FROM hotels h
-        JOIN hotel_rooms hr ON h.id = hr.hotel_id
-        WHERE hr.price_per_night BETWEEN %s AND %s
-        AND hr.is_available = true AND h.is_active = true
-        GROUP BY h.id, h.name, h.address, h.city, h.stars, h.description, h.phone_number, h.email, h.latitude, h.longitude, h.amenities, h.is_active, h.created_at, h.updated_at
-        ORDER BY h.stars DESC, h.name;
-        """
-        return self.db.execute_query(query, (min_price, max_price))
+        return self.db.execute_prepared("svc_hotels_by_price_range", (min_price, max_price, limit, offset))
     
     def get_hotel_details(self, hotel_name: str) -> Dict:
         """Get detailed information about a specific hotel"""
-        query = """
-        SELECT h.*, 
-               COUNT(hr.id) as total_rooms,
-               COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms,
-               MIN(hr.price_per_night) as min_price,
-               MAX(hr.price_per_night) as max_price,
-               COUNT(b.id) as total_bookings
-        FROM hotels h
-        LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
-        LEFT JOIN bookings b ON hr.id = b.room_id
-        WHERE LOWER(h.name) LIKE LOWER(%s) AND h.is_active = true
-        GROUP BY h.id, h.name, h.address, h.city, h.stars, h.description, h.phone_number, h.email, h.latitude, h.longitude, h.amenities, h.is_active, h.created_at, h.updated_at;
-        """
-        results = self.db.execute_query(query, (f"%{hotel_name}%",))
+        results = self.db.execute_prepared("svc_hotel_details", (f"%{hotel_name}%",))
         return results[0] if results else None
     
     def get_city_summary(self, city: str) -> Dict:
         """Get summary of hotels and rooms in a city"""
-        query = """
-        SELECT 
-            h.city,
-            COUNT(DISTINCT h.id) as hotel_count,
-            COUNT(hr.id) as total_rooms,
-            COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms,
-            AVG(h.stars) as avg_rating,
-            MIN(hr.price_per_night) as min_price,
-            MAX(hr.price_per_night) as max_price
-        FROM hotels h
-        LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
-        WHERE LOWER(h.city) LIKE LOWER(%s) AND h.is_active = true
-        GROUP BY h.city;
-        """
-        results = self.db.execute_query(query, (f"%{city}%",))
+        results = self.db.execute_prepared("svc_city_summary", (f"%{city}%",))
         return results[0] if results else None
     
     def get_recent_bookings(self, limit: int = 10) -> List[Dict]:
         """Get recent bookings for context"""
-        query = """
-        SELECT 
-            b.guest_name,
-            h.name as hotel_name,
-            h.city,
-            hr.room_number,
-            hr.room_type,
-            b.check_in,
-            b.check_out,
-            b.total_amount,
-            b.status
-        FROM bookings b
-        JOIN hotel_rooms hr ON b.room_id = hr.id
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE h.is_active = true
-        ORDER BY b.created_at DESC
-        LIMIT %s;
-        """
-        return self.db.execute_query(query, (limit,))
+        return self.db.execute_prepared("svc_recent_bookings", (limit,))
     
-    def check_room_availability(self, hotel_name: str, room_type: str = None) -> List[Dict]:
+    def check_room_availability(self, hotel_name: str, room_type: str = None, limit: int = DEFAULT_RESULT_LIMIT) -> List[Dict]:
         """Check availability of rooms in a specific hotel"""
-        query = """
-        SELECT hr.*, h.name as hotel_name, h.city
-        FROM hotel_rooms hr
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE LOWER(h.name) LIKE LOWER(%s)
-        AND hr.is_available = true AND h.is_active = true
-        """
-        params = [f"%{hotel_name}%"]
-        
-        if room_type:
-            query += " AND LOWER(hr.room_type::text) LIKE LOWER(%s)"
-            params.append(f"%{room_type}%")
-        
-        query += " ORDER BY hr.price_per_night ASC;"
-        
-        return self.db.execute_query(query, params)
+        room_type_pattern = f"%{room_type}%" if room_type else None
+        return self.db.execute_prepared("svc_room_availability", (f"%{hotel_name}%", room_type_pattern, limit))
 
     def get_hotel_by_id(self, hotel_id: int) -> Dict:
         """Get hotel details by ID"""
-        query = """
-        SELECT h.*, 
-               COUNT(hr.id) as total_rooms,
-               COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms
-        FROM hotels h
-        LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
-        WHERE h.id = %s AND h.is_active = true
-        GROUP BY h.id, h.name, h.address, h.city, h.stars, h.description, h.phone_number, h.email, h.latitude, h.longitude, h.amenities, h.is_active, h.created_at, h.updated_at;
-        """
-        results = self.db.execute_query(query, (hotel_id,))
+        results = self.db.execute_prepared("svc_hotel_by_id", (hotel_id,))
         return results[0] if results else None
 
     def search_hotel_by_name(self, hotel_name: str) -> Dict:
         """Search for a hotel by name"""
-        query = """
-        SELECT h.*, 
-               COUNT(hr.id) as total_rooms,
-               COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms
-        FROM hotels h
-        LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
-        WHERE LOWER(h.name) LIKE LOWER(%s) AND h.is_active = true
-        GROUP BY h.id, h.name, h.address, h.city, h.stars, h.description, h.phone_number, h.email, h.latitude, h.longitude, h.amenities, h.is_active, h.created_at, h.updated_at;
-        """
-        results = self.db.execute_query(query, (f"%{hotel_name}%",))
+        results = self.db.execute_prepared("svc_hotel_by_name", (f"%{hotel_name}%",))
         return results[0] if results else None
 
     def get_room_by_id(self, room_id: int) -> Dict:
         """Get room details by ID"""
-        query = """
-        SELECT hr.*, h.name as hotel_name, h.city, h.address, h.phone_number, h.email as hotel_email
-        FROM hotel_rooms hr
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE hr.id = %s AND hr.is_available = true AND h.is_active = true
-        """
-        results = self.db.execute_query(query, (room_id,))
+        results = self.db.execute_prepared("svc_room_by_id", (room_id,))
         return results[0] if results else None
 
     def check_booking_conflict(self, room_id: int, check_in: date, check_out: date) -> int:
         """Check for booking conflicts for a specific room and date range"""
-        query = """
-        SELECT COUNT(*) as conflict_count
-        FROM bookings
-        WHERE room_id = %s 
-        AND status = 'confirmed'
-        AND (
-            (check_in <= %s AND check_out > %s) OR
-            (check_in < %s AND check_out >= %s) OR
-            (check_in >= %s AND check_out <= %s)
-        )
-        """
-        results = self.db.execute_query(query, (room_id, check_in, check_in, check_out, check_out, check_in, check_out))
-        return results[0]['conflict_count'] if results else 0
+        results = self.db.execute_prepared("svc_booking_conflict", (room_id, check_in, check_out))
+        return int(results[0]['has_conflict']) if results else 0
 
     def get_booking_by_id(self, booking_id: int) -> Dict:
         """Get booking details by ID"""
-        query = """
-        SELECT b.*, 
-               hr.room_number, hr.room_type, hr.capacity, hr.price_per_night,
-               h.name as hotel_name, h.city, h.address, h.phone_number, h.email as hotel_email
-        FROM bookings b
-        JOIN hotel_rooms hr ON b.room_id = hr.id
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE b.id = %s
-        """
-        results = self.db.execute_query(query, (booking_id,))
+        results = self.db.execute_prepared("svc_booking_by_id", (booking_id,))
         return results[0] if results else None
 
     def get_confirmed_booking_by_id(self, booking_id: int) -> Dict:
         """Get confirmed booking details by ID"""
-        query = """
-        SELECT b.*, 
-               hr.room_number, hr.room_type,
-               h.name as hotel_name
-        FROM bookings b
-        JOIN hotel_rooms hr ON b.room_id = hr.id
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE b.id = %s AND b.status = 'confirmed'
-        """
-        results = self.db.execute_query(query, (booking_id,))
+        results = self.db.execute_prepared("svc_confirmed_booking_by_id", (booking_id,))
         return results[0] if results else None
 
-    def search_available_rooms_by_dates(self, city: str, check_in: date, check_out: date, room_type: str = None, max_price: float = None) -> List[Dict]:
+    def search_available_rooms_by_dates(self, city: str, check_in: date, check_out: date, room_type: str = None, max_price: float = None,
+                                        limit: int = DEFAULT_RESULT_LIMIT, offset: int = 0) -> List[Dict]:
         """Search for available rooms in a city for specific dates"""
-        query = """
-        SELECT hr.*, h.name as hotel_name, h.city, h.address, h.stars, h.amenities
-        FROM hotel_rooms hr
-        JOIN hotels h ON hr.hotel_id = h.id
-        WHERE h.is_active = true 
-        AND hr.is_available = true
-        AND LOWER(h.city) LIKE LOWER(%s)
-        AND hr.id NOT IN (
-            SELECT DISTINCT room_id 
-            FROM bookings 
-            WHERE status = 'confirmed' 
-            AND (
-                (check_in <= %s AND check_out > %s) OR
-                (check_in < %s AND check_out >= %s) OR
-                (check_in >= %s AND check_out <= %s)
-            )
+        room_type_pattern = f"%{room_type}%" if room_type else None
+        return self.db.execute_prepared(
+            "svc_available_rooms_by_dates",
+            (f"%{city}%", check_in, check_out, room_type_pattern, max_price or None, limit, offset)
         )
-        """
-        
-        params = [f"%{city}%", check_in, check_in, check_out, check_out, check_in, check_out]
-        
-        # Add optional filters
-        if room_type:
-            query += " AND LOWER(hr.room_type::text) LIKE LOWER(%s)"
-            params.append(f"%{room_type}%")
-        
-        if max_price:
-            query += " AND hr.price_per_night <= %s"
-            params.append(max_price)
-        
-        query += " ORDER BY h.stars DESC, hr.price_per_night ASC"
-        
-        return self.db.execute_query(query, params)
 
     def create_booking(self, room_id: int, guest_name: str, guest_email: str, guest_phone: str, check_in: date, check_out: date, total_amount: float) -> int:
         """Create a new booking and return the booking ID"""
@@ -317,12 +408,75 @@ class HotelSearchService:
         RETURNING id;
         """
         
-        self.db.cursor.execute(query, (room_id, guest_name, guest_email, guest_phone, check_in, check_out, total_amount, 'confirmed'))
-        self.db.connection.commit()
-        
-        result = self.db.cursor.fetchone()
+        with self.db.borrow() as cursor:
+            cursor.execute(query, (room_id, guest_name, guest_email, guest_phone, check_in, check_out, total_amount, 'confirmed'))
+            result = cursor.fetchone()
         return result['id'] if result else None
 
+    def reserve_if_available(self, room_id: int, guest_name: str, guest_email: str, guest_phone: str, check_in: date, check_out: date) -> Optional[Dict]:
+        """Book a room unless the dates overlap a confirmed booking, in one round trip.
+        Returns the room row with booking_id and total_amount (booking_id is None on a conflict), or None if the room is not bookable."""
+        # The row lock serializes bookings of the same room; the second statement takes a
+        # fresh snapshot after the lock, so it sees any booking committed while we waited
+        query = """
+        SELECT 1 FROM hotel_rooms WHERE id = %(room_id)s FOR UPDATE;
+        WITH room AS (
+            SELECT hr.*, h.name as hotel_name, h.city, h.address, h.phone_number, h.email as hotel_email
+            FROM hotel_rooms hr
+            JOIN hotels h ON hr.hotel_id = h.id
+            WHERE hr.id = %(room_id)s AND hr.is_available = true AND h.is_active = true
+        ), ins AS (
+            INSERT INTO bookings (room_id, guest_name, guest_email, guest_phone, check_in, check_out, total_amount, status)
+            SELECT room.id, %(guest_name)s, %(guest_email)s, %(guest_phone)s, %(check_in)s, %(check_out)s,
+                   room.price_per_night * (%(check_out)s::date - %(check_in)s::date), 'confirmed'
+            FROM room
+            WHERE NOT EXISTS (
+                SELECT 1 FROM bookings b
+                WHERE b.room_id = room.id AND b.status = 'confirmed'
+                AND b.stay && daterange(%(check_in)s, %(check_out)s, '[)')
+            )
+            RETURNING id, total_amount
+        )
+        SELECT room.*, ins.id as booking_id, ins.total_amount
+        FROM room LEFT JOIN ins ON true;
+        """
+        params = {
+            "room_id": room_id, "guest_name": guest_name, "guest_email": guest_email,
+            "guest_phone": guest_phone, "check_in": check_in, "check_out": check_out
+        }
+        
+        with self.db.borrow() as cursor:
+            cursor.execute(query, params)
+            room = cursor.fetchone()
+        if room and room['booking_id'] is not None:
+            self.schedule_summary_refresh()
+        return room
+
+    def cancel_if_confirmed(self, booking_id: int) -> Optional[Dict]:
+        """Cancel a confirmed booking in one round trip.
+        Returns the cancelled booking with its room and hotel name, or None if no confirmed booking has that ID."""
+        # The conditional UPDATE also makes concurrent cancellations of one booking safe: only one gets a row
+        query = """
+        WITH cancelled AS (
+            UPDATE bookings SET status = 'cancelled'
+            WHERE id = %s AND status = 'confirmed'
+            RETURNING *
+        )
+        SELECT cancelled.*, 
+               hr.room_number, hr.room_type,
+               h.name as hotel_name
+        FROM cancelled
+        JOIN hotel_rooms hr ON cancelled.room_id = hr.id
+        JOIN hotels h ON hr.hotel_id = h.id;
+        """
+        
+        with self.db.borrow() as cursor:
+            cursor.execute(query, (booking_id,))
+            cancelled = cursor.fetchone()
+        if cancelled:
+            self.schedule_summary_refresh()
+        return cancelled
+
     def cancel_booking(self, booking_id: int) -> bool:
         """Cancel a booking by updating its status"""
         query = "UPDATE bookings SET status = 'cancelled' WHERE id = %s"
@@ -331,4 +485,7 @@ class HotelSearchService:
     def update_room_availability(self, room_id: int, is_available: bool) -> bool:
         """Update room availability status"""
         query = "UPDATE hotel_rooms SET is_available = %s WHERE id = %s"
-        return self.db.execute_update(query, (is_available, room_id))
+        updated = self.db.execute_update(query, (is_available, room_id))
+        if updated:
+            self.schedule_summary_refresh()
+        return updated
@@ -63,6 +63,10 @@ def migrate_database():
             db.execute_update(trigger)
             print(f"✅ Executed trigger: {trigger[:50]}...")
         
+        # Views that already existed keep their old rows until refreshed
+        db.refresh_summary_views()
+        print("✅ Refreshed summary views")
+        
         print("✅ Database migration completed successfully!")
         
         # Check if data exists
@@ -177,6 +177,9 @@ def populate_dummy_data():
     for booking in recent_bookings:
         print(f"  {booking['guest_name']} - {booking['hotel_name']} Room {booking['room_number']} - Check-in: {booking['check_in_date']} - ${booking['total_amount']}")
     
+    # Summary views were built before the data went in
+    db.refresh_summary_views()
+    
     # Close connection
     db.disconnect()
     print("\nDatabase population completed successfully!")
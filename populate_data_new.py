@@ -203,6 +203,9 @@ def populate_dummy_data():
         for room in sample_rooms:
             print(f"  - Room {room['room_number']} ({room['room_type']}) at {room['hotel_name']} - ${room['price_per_night']}/night")
     
+    # Summary views were built before the data went in
+    db.refresh_summary_views()
+    
     db.disconnect()
     print("\nDatabase population completed successfully!")
 
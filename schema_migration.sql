@@ -60,24 +60,70 @@ CREATE TABLE bookings (
     status VARCHAR(20) DEFAULT 'confirmed' CHECK (status IN ('confirmed', 'cancelled', 'completed')),
     created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    stay daterange GENERATED ALWAYS AS (daterange(check_in, check_out, '[)')) STORED,
 
     CONSTRAINT valid_dates CHECK (check_out > check_in),
     CONSTRAINT valid_guest_email CHECK (guest_email ~ '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'),
     CONSTRAINT valid_guest_phone CHECK (guest_phone ~ '^\+?[0-9\s\-()]{7,20}$')
 );
 
+-- EXTENSIONS
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- No two confirmed bookings of a room may overlap; the GiST index behind this
+-- constraint also answers the availability overlap checks (stay && daterange(...))
+ALTER TABLE bookings ADD CONSTRAINT no_overlapping_stays
+    EXCLUDE USING gist (room_id WITH =, stay WITH &&) WHERE (status = 'confirmed');
+
 -- INDEXES
+CREATE INDEX idx_hotels_name_trgm ON hotels USING gin (name gin_trgm_ops);
 CREATE INDEX idx_hotels_city ON hotels(city);
+-- City filters use city ILIKE '%...%', which only a trigram index can serve
+CREATE INDEX idx_hotels_city_trgm ON hotels USING gin (city gin_trgm_ops);
 CREATE INDEX idx_hotels_stars ON hotels(stars);
-CREATE INDEX idx_hotels_active ON hotels(is_active);
-CREATE INDEX idx_hotel_rooms_hotel_id ON hotel_rooms(hotel_id);
-CREATE INDEX idx_hotel_rooms_available ON hotel_rooms(is_available);
+-- Covering index: room lookups by hotel are index-only scans
+CREATE INDEX idx_hotel_rooms_hotel_covering ON hotel_rooms(hotel_id) INCLUDE (is_available, price_per_night, room_type, room_number);
+-- Available rooms of a hotel in price order, readable without touching the table
+CREATE INDEX idx_rooms_avail_price ON hotel_rooms(hotel_id, price_per_night) INCLUDE (room_type, room_number) WHERE is_available = true;
 CREATE INDEX idx_hotel_rooms_price ON hotel_rooms(price_per_night);
 CREATE INDEX idx_hotel_rooms_type ON hotel_rooms(room_type);
 CREATE INDEX idx_bookings_room_id ON bookings(room_id);
 CREATE INDEX idx_bookings_dates ON bookings(check_in, check_out);
 CREATE INDEX idx_bookings_status ON bookings(status);
 
+-- SUMMARY VIEWS (pre-aggregated; refreshed after inventory changes)
+CREATE MATERIALIZED VIEW mv_city_summary AS
+SELECT 
+    h.city,
+    COUNT(DISTINCT h.id) as hotel_count,
+    COUNT(hr.id) as total_rooms,
+    COUNT(CASE WHEN hr.is_available = true THEN 1 END) as available_rooms,
+    AVG(h.stars) as avg_rating,
+    MIN(hr.price_per_night) as min_price,
+    MAX(hr.price_per_night) as max_price
+FROM hotels h
+LEFT JOIN hotel_rooms hr ON h.id = hr.hotel_id
+WHERE h.is_active = true
+GROUP BY h.city;
+CREATE UNIQUE INDEX idx_mv_city_summary_city ON mv_city_summary(city);
+
+CREATE MATERIALIZED VIEW mv_room_types_and_prices AS
+SELECT 
+    hr.hotel_id,
+    hr.room_type,
+    COUNT(*) as available_count,
+    MIN(hr.price_per_night) as min_price,
+    MAX(hr.price_per_night) as max_price,
+    AVG(hr.price_per_night) as avg_price,
+    h.name as hotel_name,
+    h.city
+FROM hotel_rooms hr
+JOIN hotels h ON hr.hotel_id = h.id
+WHERE hr.is_available = true AND h.is_active = true
+GROUP BY hr.hotel_id, hr.room_type, h.name, h.city;
+CREATE UNIQUE INDEX idx_mv_room_types_hotel_type ON mv_room_types_and_prices(hotel_id, room_type);
+
 -- AUTO TIMESTAMP FUNCTION
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
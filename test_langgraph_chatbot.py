@@ -87,6 +87,13 @@ def test_chatbot_responses():
         print(f"❌ Error during testing: {str(e)}")
         print("Please make sure your OpenAI API key is set in the .env file.")
 
+def _print_stream(chunks):
+    """Print a reply as it streams in"""
+    print("   ", end="", flush=True)
+    for chunk in chunks:
+        print(chunk, end="", flush=True)
+    print()
+
 def interactive_comparison():
     """Interactive comparison between both chatbots"""
     
@@ -129,23 +136,20 @@ def interactive_comparison():
                 # Show both responses
                 print("\n🔧 LangChain Bot:")
                 try:
-                    lc_response = langchain_bot.chat(user_input)
-                    print(f"   {lc_response}")
+                    _print_stream(langchain_bot.stream_chat(user_input))
                 except Exception as e:
                     print(f"   ❌ Error: {str(e)}")
                 
                 print("\n🔗 LangGraph Bot:")
                 try:
-                    lg_response = langgraph_bot.chat(user_input, thread_id)
-                    print(f"   {lg_response}")
+                    _print_stream(langgraph_bot.stream_chat(user_input, thread_id))
                 except Exception as e:
                     print(f"   ❌ Error: {str(e)}")
             else:
                 # Show only LangGraph response
                 print("\n🔗 LangGraph Bot:")
                 try:
-                    lg_response = langgraph_bot.chat(user_input, thread_id)
-                    print(f"   {lg_response}")
+                    _print_stream(langgraph_bot.stream_chat(user_input, thread_id))
                 except Exception as e:
                     print(f"   ❌ Error: {str(e)}")
                     
@@ -0,0 +1,242 @@
+"""
+Tests for the LangGraph bot's tool-call guards, history summary and booking SQL.
+They book and delete rows, so they run only when HOTELBOT_TEST_DB_NAME names a scratch database
+(the other connection settings come from .env). The chat models are replaced by scripted fakes,
+so no OpenAI key is needed.
+"""
+
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any
+
+import psycopg2
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+TEST_DB_NAME = os.getenv("HOTELBOT_TEST_DB_NAME")
+if not TEST_DB_NAME:
+    pytest.skip("set HOTELBOT_TEST_DB_NAME to a scratch database to run these tests", allow_module_level=True)
+
+import database
+
+# database loads .env with override, so DB_NAME is pointed at the test database afterwards and the shared
+# pool is opened before chatbot_langgraph reloads .env; its connect() then reuses this pool
+os.environ["DB_NAME"] = TEST_DB_NAME
+database.get_pool()
+
+import chatbot_langgraph
+from config import CHATBOT_CONFIG
+
+# The checkpoint pool is opened with the first bot, after chatbot_langgraph reloaded .env
+os.environ["DB_NAME"] = TEST_DB_NAME
+
+SERVICE = chatbot_langgraph._SEARCH_SERVICE
+GUEST_PHONE = "+1234567890"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers with script(messages); bound tools are ignored"""
+    script: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.script(messages))])
+
+
+def _tool_call(name: str, args: dict, call_id: str) -> dict:
+    return {"name": name, "args": args, "id": call_id}
+
+
+def _messages(bot, thread_id: str) -> list:
+    return bot._run(bot.app.aget_state({"configurable": {"thread_id": thread_id}})).values["messages"]
+
+
+def _tool_results(bot, thread_id: str) -> int:
+    return sum(isinstance(message, ToolMessage) for message in _messages(bot, thread_id))
+
+
+@pytest.fixture
+def make_bot(monkeypatch):
+    """Build bots whose chat model runs the given script and whose summary model returns a fixed summary"""
+
+    def build(script, summary="The guest asked about hotels."):
+        def chat_openai(**kwargs):
+            if kwargs.get("tags"):
+                return ScriptedChatModel(script=lambda messages: AIMessage(content=summary), tags=kwargs["tags"])
+            return ScriptedChatModel(script=script)
+
+        monkeypatch.setattr(chatbot_langgraph, "ChatOpenAI", chat_openai)
+        chatbot_langgraph._build_graph.cache_clear()
+        return chatbot_langgraph.HotelBotLangGraph(openai_api_key="test-key")
+
+    yield build
+    chatbot_langgraph._build_graph.cache_clear()
+
+
+@pytest.fixture
+def thread_id():
+    return f"pytest-{uuid.uuid4().hex}"
+
+
+def _repeating_script(vary_args: bool):
+    """Always ask for another rating search, with the same or with new arguments"""
+    counter = iter(range(1000))
+
+    def script(messages):
+        n = next(counter)
+        min_rating = f"4.{n:02d}" if vary_args else "4"
+        return AIMessage(content="", tool_calls=[_tool_call("search_hotels_by_rating", {"min_rating": min_rating}, f"call{n}")])
+    return script
+
+
+def test_repeated_tool_call_ends_the_turn(make_bot, thread_id):
+    bot = make_bot(_repeating_script(vary_args=False))
+    assert bot.chat("find good hotels", thread_id) == chatbot_langgraph._TOOL_LOOP_REPLY
+    assert _tool_results(bot, thread_id) == 1
+
+
+def test_loop_guard_reply_is_streamed(make_bot, thread_id):
+    bot = make_bot(_repeating_script(vary_args=False))
+    assert "".join(bot.stream_chat("find good hotels", thread_id)) == chatbot_langgraph._TOOL_LOOP_REPLY
+
+
+def test_tool_rounds_are_capped(make_bot, thread_id):
+    bot = make_bot(_repeating_script(vary_args=True))
+    assert bot.chat("find good hotels", thread_id) == chatbot_langgraph._TOOL_LOOP_REPLY
+    assert _tool_results(bot, thread_id) == CHATBOT_CONFIG["max_tool_rounds"]
+
+
+def test_duplicate_calls_in_one_response_run_once(make_bot, thread_id):
+    def script(messages):
+        if messages[-1].type == "human":
+            call = {"min_rating": "4"}
+            return AIMessage(content="", tool_calls=[
+                _tool_call("search_hotels_by_rating", call, "first"),
+                _tool_call("search_hotels_by_rating", call, "second")
+            ])
+        return AIMessage(content="done")
+
+    bot = make_bot(script)
+    assert bot.chat("find good hotels", thread_id) == "done"
+    tool_calls = [message.tool_calls for message in _messages(bot, thread_id) if isinstance(message, AIMessage) and message.tool_calls]
+    assert [len(calls) for calls in tool_calls] == [1]
+    assert _tool_results(bot, thread_id) == 1
+
+
+def test_repeated_call_is_dropped_from_a_mixed_response(make_bot, thread_id):
+    def script(messages):
+        results = sum(isinstance(message, ToolMessage) for message in messages)
+        if results == 0:
+            return AIMessage(content="", tool_calls=[_tool_call("search_hotels_by_rating", {"min_rating": "4"}, "first")])
+        if results == 1:
+            return AIMessage(content="", tool_calls=[
+                _tool_call("search_hotels_by_rating", {"min_rating": "4"}, "repeat"),
+                _tool_call("search_hotels_by_rating", {"min_rating": "5"}, "new")
+            ])
+        return AIMessage(content="done")
+
+    bot = make_bot(script)
+    assert bot.chat("find good hotels", thread_id) == "done"
+    tool_calls = [message.tool_calls for message in _messages(bot, thread_id) if isinstance(message, AIMessage) and message.tool_calls]
+    assert [[call["id"] for call in calls] for calls in tool_calls] == [["first"], ["new"]]
+    assert _tool_results(bot, thread_id) == 2
+
+
+def test_long_thread_is_summarized(make_bot, thread_id):
+    bot = make_bot(lambda messages: AIMessage(content="ok"), summary="Summary of the stay search.")
+    turns = chatbot_langgraph._SUMMARIZE_AFTER_MESSAGES // 2 + 2
+    for i in range(turns):
+        assert bot.chat(f"question {i}", thread_id) == "ok"
+
+    state = bot._run(bot.app.aget_state({"configurable": {"thread_id": thread_id}})).values
+    assert state["summary"] == "Summary of the stay search."
+    assert len(state["messages"]) <= chatbot_langgraph._SUMMARIZE_AFTER_MESSAGES
+    assert state["messages"][-2].content == f"question {turns - 1}"
+
+
+@pytest.fixture
+def room_id():
+    rows = SERVICE.db.execute_query("""
+        SELECT hr.id FROM hotel_rooms hr JOIN hotels h ON hr.hotel_id = h.id
+        WHERE hr.is_available = true AND h.is_active = true
+        ORDER BY hr.id LIMIT 1
+    """)
+    if not rows:
+        pytest.skip("no bookable room in the database")
+    return rows[0]["id"]
+
+
+@pytest.fixture
+def guest_email():
+    """Unique guest email; every booking made with it is deleted afterwards"""
+    email = f"pytest-{uuid.uuid4().hex[:12]}@example.com"
+    yield email
+    SERVICE.db.execute_update("DELETE FROM bookings WHERE guest_email = %s", (email,))
+
+
+def _reserve(room_id: int, guest_email: str, check_in: date, check_out: date):
+    return SERVICE.reserve_if_available(room_id, "Test Guest", guest_email, GUEST_PHONE, check_in, check_out)
+
+
+def test_reserve_rejects_overlapping_stays(room_id, guest_email):
+    first = _reserve(room_id, guest_email, date(2040, 1, 10), date(2040, 1, 13))
+    assert first["booking_id"] is not None
+
+    assert _reserve(room_id, guest_email, date(2040, 1, 12), date(2040, 1, 15))["booking_id"] is None
+    assert _reserve(room_id, guest_email, date(2040, 1, 8), date(2040, 1, 20))["booking_id"] is None
+    assert SERVICE.check_booking_conflict(room_id, date(2040, 1, 12), date(2040, 1, 15)) == 1
+
+
+def test_stays_are_half_open(room_id, guest_email):
+    assert _reserve(room_id, guest_email, date(2040, 2, 10), date(2040, 2, 13))["booking_id"] is not None
+    # Checking in on the previous guest's check-out day is not a conflict
+    assert SERVICE.check_booking_conflict(room_id, date(2040, 2, 13), date(2040, 2, 15)) == 0
+    assert _reserve(room_id, guest_email, date(2040, 2, 13), date(2040, 2, 15))["booking_id"] is not None
+    assert _reserve(room_id, guest_email, date(2040, 2, 7), date(2040, 2, 10))["booking_id"] is not None
+
+
+def test_concurrent_reservations_book_the_room_once(room_id, guest_email):
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: _reserve(room_id, guest_email, date(2040, 3, 1), date(2040, 3, 4)), range(8)))
+    assert sum(result["booking_id"] is not None for result in results) == 1
+
+
+def test_cancel_if_confirmed_cancels_once(room_id, guest_email):
+    booked = _reserve(room_id, guest_email, date(2040, 4, 1), date(2040, 4, 3))
+
+    cancelled = SERVICE.cancel_if_confirmed(booked["booking_id"])
+    assert cancelled["id"] == booked["booking_id"]
+    assert cancelled["status"] == "cancelled"
+    assert (cancelled["hotel_name"], cancelled["room_number"]) == (booked["hotel_name"], booked["room_number"])
+    assert SERVICE.cancel_if_confirmed(booked["booking_id"]) is None
+
+    # Cancelled stays no longer block the dates
+    assert _reserve(room_id, guest_email, date(2040, 4, 1), date(2040, 4, 3))["booking_id"] is not None
+
+
+def test_concurrent_cancels_succeed_once(room_id, guest_email):
+    booked = _reserve(room_id, guest_email, date(2040, 5, 1), date(2040, 5, 3))
+    with ThreadPoolExecutor(4) as executor:
+        replies = list(executor.map(
+            lambda _: chatbot_langgraph.cancel_booking.invoke({"booking_id": str(booked["booking_id"])}), range(4)
+        ))
+    assert sum(reply.startswith("❌ Booking Cancelled") for reply in replies) == 1
+    assert sum("not found or already cancelled" in reply for reply in replies) == 3
+
+
+def test_exclusion_constraint_rejects_overlapping_inserts(room_id, guest_email):
+    if not SERVICE.db.execute_query("SELECT 1 FROM pg_constraint WHERE conname = 'no_overlapping_stays'"):
+        pytest.skip("no_overlapping_stays is not installed (it needs btree_gist)")
+    SERVICE.create_booking(room_id, "Test Guest", guest_email, GUEST_PHONE, date(2040, 6, 1), date(2040, 6, 5), 100)
+    with pytest.raises(psycopg2.errors.ExclusionViolation):
+        SERVICE.create_booking(room_id, "Test Guest", guest_email, GUEST_PHONE, date(2040, 6, 4), date(2040, 6, 6), 100)